@@ -0,0 +1,58 @@
+"""
+Cached JWT Authentication
+
+Drop-in replacement for SimpleJWT's JWTAuthentication that resolves the user
+from a short-TTL cache instead of hitting the database on every authenticated
+request. Cache entries are dropped whenever the User row is saved or deleted
+(password change, deactivation, ...); see accounts/signals.py. The 'auth'
+cache is shared by all worker processes, so the drop is seen by every worker
+on its next request.
+"""
+
+from django.core.cache import caches
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+USER_CACHE_ALIAS = 'auth'  # see CACHES in settings.py
+
+
+def user_cache():
+    return caches[USER_CACHE_ALIAS]
+
+
+def user_cache_key(user_id):
+    return f'jwt-user:{user_id}'
+
+
+def invalidate_cached_user(user_id):
+    user_cache().delete(user_cache_key(user_id))
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        if user_id is None:
+            # Let SimpleJWT raise its usual InvalidToken error
+            return super().get_user(validated_token)
+
+        key = user_cache_key(user_id)
+        user = user_cache().get(key)
+        if user is None:
+            user = super().get_user(validated_token)
+            user_cache().set(key, user)
+            return user
+
+        # Token-dependent checks still run against the cached user
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        return user
@@ -0,0 +1,107 @@
+"""
+Benchmark authenticated requests against /api/v1/protected/.
+
+Serves the app on a local single-threaded WSGI server and compares requests
+per second for plain SimpleJWT authentication vs CachedJWTAuthentication,
+each with and without persistent database connections.
+
+    python manage.py migrate
+    python manage.py bench_auth --requests 2000
+
+A throwaway `bench-auth-user` is created for the run and deleted afterwards.
+"""
+
+import json
+import threading
+import time
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+import requests
+from django.contrib.auth import get_user_model
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from accounts.authentication import CachedJWTAuthentication
+from accounts.views import ProtectedView
+
+BENCH_USERNAME = 'bench-auth-user'
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class Command(BaseCommand):
+    help = "Measure requests/sec on protected/ for each authentication backend and DB connection mode."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=1000, help="Timed requests per configuration")
+        parser.add_argument('--warmup', type=int, default=50, help="Untimed requests per configuration")
+        parser.add_argument('--conn-max-age', type=int, default=60, help="CONN_MAX_AGE for the persistent runs")
+        parser.add_argument('--json', action='store_true', help="Print results as JSON")
+
+    def handle(self, *args, **options):
+        user, _ = get_user_model().objects.get_or_create(username=BENCH_USERNAME)
+        token = str(RefreshToken.for_user(user).access_token)
+
+        server = make_server('127.0.0.1', 0, WSGIHandler(), handler_class=QuietHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f'http://127.0.0.1:{server.server_port}/api/v1/protected/'
+
+        db_settings = connections.settings[DEFAULT_DB_ALIAS]
+        original_auth = ProtectedView.authentication_classes
+        original_max_age = db_settings.get('CONN_MAX_AGE', 0)
+
+        # Non-persistent runs go first: a persistent connection would outlive a switch back to 0
+        configurations = [
+            ('JWTAuthentication', JWTAuthentication, 0),
+            ('CachedJWTAuthentication', CachedJWTAuthentication, 0),
+            ('JWTAuthentication', JWTAuthentication, options['conn_max_age']),
+            ('CachedJWTAuthentication', CachedJWTAuthentication, options['conn_max_age']),
+        ]
+
+        results = []
+        try:
+            with requests.Session() as session:
+                session.headers['Authorization'] = f'Bearer {token}'
+                for name, auth_class, max_age in configurations:
+                    ProtectedView.authentication_classes = [auth_class]
+                    db_settings['CONN_MAX_AGE'] = max_age
+
+                    for _ in range(options['warmup']):
+                        session.get(url).raise_for_status()
+
+                    start = time.perf_counter()
+                    for _ in range(options['requests']):
+                        session.get(url).raise_for_status()
+                    elapsed = time.perf_counter() - start
+
+                    results.append({
+                        'authentication': name,
+                        'conn_max_age': max_age,
+                        'requests': options['requests'],
+                        'seconds': round(elapsed, 3),
+                        'requests_per_sec': round(options['requests'] / elapsed, 1),
+                    })
+        finally:
+            ProtectedView.authentication_classes = original_auth
+            db_settings['CONN_MAX_AGE'] = original_max_age
+            server.shutdown()
+            server.server_close()
+            user.delete()
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        baseline = results[0]['requests_per_sec']
+        self.stdout.write(f"{'authentication':<26}{'CONN_MAX_AGE':>14}{'req/s':>10}{'vs baseline':>14}")
+        for row in results:
+            gain = row['requests_per_sec'] / baseline if baseline else 0
+            self.stdout.write(
+                f"{row['authentication']:<26}{row['conn_max_age']:>14}{row['requests_per_sec']:>10}{gain:>13.2f}x"
+            )
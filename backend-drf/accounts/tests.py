@@ -1,3 +1,68 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache.backends.filebased import FileBasedCache
+from django.test import RequestFactory, TestCase, override_settings
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .authentication import CachedJWTAuthentication, user_cache, user_cache_key
+
+AUTH_CACHE_DIR = tempfile.mkdtemp(prefix='test-auth-cache-')
+
+
+def tearDownModule():
+    shutil.rmtree(AUTH_CACHE_DIR, ignore_errors=True)
+
+
+@override_settings(CACHES={
+    **settings.CACHES,
+    'auth': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': AUTH_CACHE_DIR},
+})
+class CachedJWTAuthenticationTests(TestCase):
+    def setUp(self):
+        user_cache().clear()
+        self.user = get_user_model().objects.create_user('alice', password='first-password-1')
+
+    def authenticate(self, token=None):
+        token = token or AccessToken.for_user(self.user)
+        request = RequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {token}')
+        return CachedJWTAuthentication().authenticate(request)[0]
+
+    def test_cache_hit_does_not_query_the_database(self):
+        token = AccessToken.for_user(self.user)
+        self.assertEqual(self.authenticate(token).pk, self.user.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.authenticate(token).pk, self.user.pk)
+
+    def test_entries_are_shared_between_processes(self):
+        # A second cache instance on the same directory stands in for another worker
+        other_worker = FileBasedCache(AUTH_CACHE_DIR, {})
+        self.authenticate()
+        self.assertEqual(other_worker.get(user_cache_key(self.user.pk)).pk, self.user.pk)
+
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(other_worker.get(user_cache_key(self.user.pk)))
+
+    def test_deactivated_user_is_rejected(self):
+        token = AccessToken.for_user(self.user)
+        self.authenticate(token)
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate(token)
+
+    def test_password_change_is_seen_by_a_cached_user(self):
+        # SimpleJWT's modules hold on to the api_settings object, so patch it rather than SIMPLE_JWT
+        with mock.patch.object(api_settings, 'CHECK_REVOKE_TOKEN', True):
+            token = AccessToken.for_user(self.user)
+            self.authenticate(token)
+            self.user.set_password('second-password-2')
+            self.user.save()
+            with self.assertRaisesMessage(AuthenticationFailed, 'password has been changed'):
+                self.authenticate(token)
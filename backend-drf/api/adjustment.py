@@ -0,0 +1,83 @@
+"""
+Sentiment Adjustment Rules
+
+Conflict resolution between the LSTM forecast and market sentiment, written
+as array operations so the same code serves a single request in the view and
+whole histories in the backtest (api/backtest.py).
+
+Rules, checked in order:
+1. LSTM predicts a big rise but sentiment is bearish -> dampen or flip to a small decline
+2. LSTM predicts a big fall but sentiment is bullish -> dampen or flip to a small rise
+3. LSTM predicts a very large move -> keep only a fraction of it
+4. Otherwise -> fine-tune by sentiment score and RSI
+"""
+
+import numpy as np
+
+CONFLICT_BEARISH = 'lstm_bullish_sentiment_bearish'
+CONFLICT_BULLISH = 'lstm_bearish_sentiment_bullish'
+LARGE_MOVE = 'large_move_cap'
+FINE_TUNE = 'sentiment_fine_tune'
+RULES = (CONFLICT_BEARISH, CONFLICT_BULLISH, LARGE_MOVE, FINE_TUNE)
+
+DEFAULT_PARAMS = {
+    'conflict_pct': 2.0,          # LSTM move (%) that counts as a strong call
+    'sentiment_cutoff': 0.1,      # |score| above which sentiment leans one way
+    'flip_cutoff': 0.3,           # |score| above which a conflicting call is flipped
+    'flip_factor': 0.1,           # fraction of the move kept (with flipped sign) when flipping
+    'large_move_pct': 5.0,        # LSTM move (%) treated as unreliable
+    'conservative_factor': 0.3,   # fraction of a large move that is kept
+    'sentiment_weight': 0.02,     # max fine-tuning from sentiment score (±2%)
+    'rsi_weight': 0.01,           # max fine-tuning from RSI extremes (±1%)
+}
+
+
+def adjust_predictions(today_price, base_prediction, sentiment_score, overall_sentiment, rsi, params=None):
+    """
+    Apply the adjustment rules element-wise.
+    Inputs broadcast against each other; rsi may be NaN where unavailable.
+    Returns (adjusted_prediction, rule_index) where rule_index indexes RULES.
+    """
+    p = {**DEFAULT_PARAMS, **(params or {})}
+    today_price = np.asarray(today_price, dtype=np.float64)
+    base_prediction = np.asarray(base_prediction, dtype=np.float64)
+    score = np.asarray(sentiment_score, dtype=np.float64)
+    overall = np.asarray(overall_sentiment)
+    rsi = np.asarray(rsi, dtype=np.float64)
+
+    base_change_pct = (base_prediction - today_price) / today_price * 100
+
+    lstm_bullish = base_change_pct > p['conflict_pct']
+    lstm_bearish = base_change_pct < -p['conflict_pct']
+    is_bearish = (overall == 'bearish') | (score < -p['sentiment_cutoff'])
+    is_bullish = (overall == 'bullish') | (score > p['sentiment_cutoff'])
+
+    conflict_bearish = lstm_bullish & is_bearish
+    conflict_bullish = lstm_bearish & is_bullish & ~conflict_bearish
+    large_move = (np.abs(base_change_pct) > p['large_move_pct']) & ~conflict_bearish & ~conflict_bullish
+
+    # 1. Map sentiment_score from [-1, 0] to dampening [0.1, 0.5]; very bearish flips to a small decline
+    dampening = np.maximum(0.1, 0.5 + score * 0.4)
+    bearish_change = np.where(score < -p['flip_cutoff'],
+                              -np.abs(base_change_pct) * p['flip_factor'], base_change_pct * dampening)
+
+    # 2. Mirror image for bullish sentiment against a bearish LSTM call
+    dampening = np.maximum(0.1, 0.5 - score * 0.4)
+    bullish_change = np.where(score > p['flip_cutoff'],
+                              np.abs(base_change_pct) * p['flip_factor'], base_change_pct * dampening)
+
+    # 3. Large predictions are often unreliable
+    capped_change = base_change_pct * p['conservative_factor']
+
+    # 4. Sentiment and RSI fine-tuning applied to the LSTM prediction itself
+    fine_tune = score * p['sentiment_weight']
+    fine_tune = fine_tune - np.where(rsi > 70, p['rsi_weight'] * ((rsi - 70) / 30), 0)
+    fine_tune = fine_tune + np.where(rsi < 30, p['rsi_weight'] * ((30 - rsi) / 30), 0)
+
+    adjusted_change = np.select([conflict_bearish, conflict_bullish, large_move],
+                                [bearish_change, bullish_change, capped_change], 0)
+    adjusted = np.where(conflict_bearish | conflict_bullish | large_move,
+                        today_price * (1 + adjusted_change / 100),
+                        base_prediction * (1 + fine_tune))
+    rule = np.select([conflict_bearish, conflict_bullish, large_move], [0, 1, 2], 3)
+    return adjusted, rule
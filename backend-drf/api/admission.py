@@ -0,0 +1,165 @@
+"""
+Admission Control
+
+Keeps expensive prediction requests from starving the cheap endpoints:
+1. Global concurrency limit - at most N predictions run at once
+2. Per-user limit - one client cannot occupy every slot or the whole queue
+3. Bounded wait queue - excess requests wait for a slot, up to a queue depth
+4. Load shedding - requests that would exceed the queue depth or the expected
+   wait are rejected immediately (429 per-user, 503 global) with Retry-After
+
+Limits are per process (threads within one worker share them).
+"""
+
+import math
+import threading
+import time
+from django.conf import settings
+from rest_framework import status
+from rest_framework.exceptions import APIException, Throttled
+
+DEFAULTS = {
+    'MAX_CONCURRENT': 2,
+    'MAX_PER_USER': 1,
+    'MAX_QUEUE': 8,
+    'MAX_WAIT_SECONDS': 15.0,
+    'INITIAL_SERVICE_SECONDS': 3.0,
+}
+
+
+class ServerOverloaded(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Prediction service is at capacity, please retry later.'
+    default_code = 'overloaded'
+
+    def __init__(self, wait, detail=None):
+        self.wait = max(1, math.ceil(wait))
+        super().__init__(detail)
+
+
+class AdmissionController:
+    """
+    Counting semaphore with a bounded FIFO-ish wait queue and per-key limits.
+    Service time is tracked as an exponential moving average so the expected
+    queue wait can be estimated before a request is admitted to the queue.
+    """
+
+    def __init__(self, max_concurrent, max_per_user, max_queue, max_wait_seconds,
+                 initial_service_seconds=DEFAULTS['INITIAL_SERVICE_SECONDS']):
+        self.max_concurrent = max_concurrent
+        self.max_per_user = max_per_user
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+
+        self.in_flight = 0
+        self.queued = 0
+        self.rejected = 0
+        self.avg_service_seconds = initial_service_seconds
+        self._per_key = {}
+        self._cond = threading.Condition()
+
+    @classmethod
+    def from_settings(cls):
+        options = {**DEFAULTS, **getattr(settings, 'PREDICTION_ADMISSION', {})}
+        return cls(
+            max_concurrent=options['MAX_CONCURRENT'],
+            max_per_user=options['MAX_PER_USER'],
+            max_queue=options['MAX_QUEUE'],
+            max_wait_seconds=options['MAX_WAIT_SECONDS'],
+            initial_service_seconds=options['INITIAL_SERVICE_SECONDS'],
+        )
+
+    def expected_wait(self, position):
+        """Seconds until the request at queue `position` (1 = next) gets a slot."""
+        return position / self.max_concurrent * self.avg_service_seconds
+
+    def acquire(self, key):
+        """Block until a slot is free; raise Throttled/ServerOverloaded instead of queueing past the limits."""
+        with self._cond:
+            if self._per_key.get(key, 0) >= self.max_per_user:
+                self.rejected += 1
+                raise Throttled(wait=max(1, math.ceil(self.avg_service_seconds)))
+
+            if self.in_flight >= self.max_concurrent or self.queued > 0:
+                expected = self.expected_wait(self.queued + 1)
+                if self.queued >= self.max_queue or expected > self.max_wait_seconds:
+                    self.rejected += 1
+                    raise ServerOverloaded(wait=expected)
+
+                self.queued += 1
+                self._per_key[key] = self._per_key.get(key, 0) + 1
+                deadline = time.monotonic() + self.max_wait_seconds
+                try:
+                    while self.in_flight >= self.max_concurrent:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            self._forget(key)
+                            self.rejected += 1
+                            raise ServerOverloaded(wait=self.expected_wait(self.queued))
+                        self._cond.wait(remaining)
+                finally:
+                    self.queued -= 1
+            else:
+                self._per_key[key] = self._per_key.get(key, 0) + 1
+
+            self.in_flight += 1
+        return key, time.monotonic()
+
+    def _forget(self, key):
+        """Drop one hold of `key`; keys are removed at zero so idle clients cost nothing."""
+        if self._per_key[key] <= 1:
+            del self._per_key[key]
+        else:
+            self._per_key[key] -= 1
+
+    def release(self, ticket):
+        key, started = ticket
+        elapsed = time.monotonic() - started
+        with self._cond:
+            self.in_flight -= 1
+            self._forget(key)
+            self.avg_service_seconds = 0.8 * self.avg_service_seconds + 0.2 * elapsed
+            self._cond.notify()
+
+    def snapshot(self):
+        with self._cond:
+            return {
+                'in_flight': self.in_flight,
+                'queued': self.queued,
+                'rejected': self.rejected,
+                'max_concurrent': self.max_concurrent,
+                'max_per_user': self.max_per_user,
+                'max_queue': self.max_queue,
+                'avg_service_seconds': round(self.avg_service_seconds, 2),
+                'expected_wait_seconds': round(self.expected_wait(self.queued + 1), 2)
+                if self.in_flight >= self.max_concurrent else 0.0,
+            }
+
+
+prediction_admission = AdmissionController.from_settings()
+
+
+class AdmissionControlMixin:
+    """
+    APIView mixin that holds an admission slot from after authentication until
+    the response is finalized. Set `admission_controller` on the view.
+    """
+    admission_controller = prediction_admission
+    admission_exempt_methods = ('OPTIONS', 'HEAD')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method in self.admission_exempt_methods:
+            return
+        if request.user and request.user.is_authenticated:
+            key = f'user:{request.user.pk}'
+        else:
+            key = f"ip:{request.META.get('REMOTE_ADDR', '')}"
+        self._admission_ticket = self.admission_controller.acquire(key)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        ticket = getattr(self, '_admission_ticket', None)
+        if ticket is not None:
+            self._admission_ticket = None
+            self.admission_controller.release(ticket)
+        return super().finalize_response(request, response, *args, **kwargs)
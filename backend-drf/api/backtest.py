@@ -0,0 +1,183 @@
+"""
+Sentiment Rule Backtest
+
+Replays the prediction pipeline over full histories for many tickers at once:
+1. Every 100-day window of every ticker is min-max scaled the way the view
+   scales "the last 100 days", and the LSTM predicts them in large batches
+2. Historical RSI and volume signals are rebuilt as array series and scored
+   exactly like get_sentiment_summary
+3. api/adjustment.py applies the conflict-resolution rules to all days at once
+4. Raw and adjusted forecasts are scored per rule (MAPE, directional accuracy)
+
+News and Fear & Greed have no history, so the backtest sentiment is the
+technical part only (RSI + volume).
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from .adjustment import RULES, adjust_predictions
+from .sentiment import classify_sentiment, rsi_series
+from .series import WINDOW
+
+
+def _windows(close, days=None):
+    view = sliding_window_view(close, WINDOW)[:-1]  # row i ends at day i + WINDOW - 1
+    today_idx = np.arange(WINDOW - 1, len(close) - 1)
+    if days:
+        view, today_idx = view[-days:], today_idx[-days:]
+    return view, today_idx
+
+
+def window_bounds(close, days=None):
+    """
+    Min-max scaling bounds of the window ending on every day t that has a next
+    day to compare against. Returns (lo, rng, today_idx); O(n) memory.
+    """
+    view, today_idx = _windows(close, days)
+    lo = view.min(axis=1)
+    rng = view.max(axis=1) - lo
+    rng[rng <= 0] = 1
+    return lo, rng, today_idx
+
+
+def scale_windows(close, lo, rng, days=None):
+    """Scaled model inputs for the windows described by window_bounds(); float32 (n, WINDOW)."""
+    view, _ = _windows(close, days)
+    return (view - lo[:, np.newaxis]) / rng[:, np.newaxis]
+
+
+def prepare_windows(close, days=None):
+    """
+    Scaled model inputs for every day t that has a next day to compare against.
+    Returns (x, lo, rng, today_idx); x is float32 (n, WINDOW).
+    """
+    lo, rng, today_idx = window_bounds(close, days)
+    return scale_windows(close, lo, rng, days), lo, rng, today_idx
+
+
+def _trailing_mean(values, window):
+    """Mean of the `window` values ending at each index (NaN before a full window)."""
+    csum = np.concatenate(([0.0], np.cumsum(values, dtype=np.float64)))
+    out = np.full(len(values), np.nan)
+    out[window - 1:] = (csum[window:] - csum[:-window]) / window
+    return out
+
+
+def technical_sentiment(close, volume, today_idx):
+    """
+    Day-by-day RSI and volume signals, weighted as in get_sentiment_summary.
+    Returns (sentiment_score, overall_sentiment, rsi) for each day in today_idx.
+    """
+    rsi = rsi_series(close)[today_idx]
+    bullish = np.zeros(len(today_idx))
+    bearish = np.zeros(len(today_idx))
+
+    # 1. RSI: overbought/oversold count fully, plain momentum counts half
+    has_rsi = ~np.isnan(rsi)
+    bearish += has_rsi & (rsi > 70)
+    bullish += has_rsi & (rsi < 30)
+    bullish += 0.5 * (has_rsi & (rsi > 50) & (rsi <= 70))
+    bearish += 0.5 * (has_rsi & (rsi >= 30) & (rsi <= 50))
+
+    # 2. Volume: a volume spike confirms the 5-day price direction
+    recent = _trailing_mean(volume, 5)[today_idx]
+    average = _trailing_mean(volume, 20)[today_idx]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ratio = np.round(np.where(average > 0, recent / average, 1.0), 2)
+    spike = ~np.isnan(ratio) & (ratio > 1.2) & (today_idx >= 4)
+    change = close[today_idx] - close[np.maximum(today_idx - 4, 0)]
+    bullish += spike & (change > 0)
+    bearish += spike & (change <= 0)
+
+    score, overall = classify_sentiment(bullish, bearish)
+    return score, overall, rsi
+
+
+def score_forecast(today, actual, predicted):
+    """(MAPE %, directional accuracy %) of next-day forecasts made on `today` prices."""
+    if len(actual) == 0:
+        return None, None
+    mape = np.mean(np.abs((actual - predicted) / actual)) * 100
+    directional = np.mean((predicted > today) == (actual > today)) * 100
+    return round(float(mape), 3), round(float(directional), 2)
+
+
+def summarize(today, actual, raw, adjusted, rule):
+    """Raw-vs-adjusted error and directional accuracy, overall and per rule."""
+    rows = {}
+    groups = [('all', np.ones(len(rule), dtype=bool))] + [(name, rule == i) for i, name in enumerate(RULES)]
+    for name, mask in groups:
+        count = int(mask.sum())
+        raw_mape, raw_dir = score_forecast(today[mask], actual[mask], raw[mask])
+        adj_mape, adj_dir = score_forecast(today[mask], actual[mask], adjusted[mask])
+        rows[name] = {
+            'days': count,
+            'share': round(count / len(rule), 4) if len(rule) else 0,
+            'raw_mape': raw_mape,
+            'adjusted_mape': adj_mape,
+            'raw_directional_accuracy': raw_dir,
+            'adjusted_directional_accuracy': adj_dir,
+            'mean_adjustment_pct': round(float(np.mean((adjusted[mask] - raw[mask]) / raw[mask]) * 100), 3)
+            if count else None,
+        }
+    return rows
+
+
+def run_backtest(histories, model, days=None, params=None, batch_size=1024, max_windows=50000):
+    """
+    Backtest the adjustment rules over {ticker: PriceHistory}.
+    Only the scaling bounds are kept per ticker; the (n, WINDOW) model inputs
+    are built when a batch is flushed, and windows from several tickers are
+    stacked into one predict() call until max_windows is reached, so the model
+    input never holds much more than max_windows rows at a time.
+    """
+    prepared = []
+    for ticker, history in histories.items():
+        if len(history) <= WINDOW + 1:
+            continue
+        lo, rng, today_idx = window_bounds(history.close, days)
+        prepared.append((ticker, history, lo, rng, today_idx))
+
+    # Batched LSTM inference across tickers
+    predictions = {}
+    pending, pending_windows = [], 0
+    for item in prepared + [None]:
+        if item is not None:
+            pending.append(item)
+            pending_windows += len(item[4])
+        if pending and (item is None or pending_windows >= max_windows):
+            x = np.concatenate([scale_windows(history.close, lo, rng, days)
+                                for _, history, lo, rng, _ in pending])[..., np.newaxis]
+            scaled = model.predict(x, batch_size=batch_size, verbose=0).ravel()
+            del x
+            offset = 0
+            for ticker, _, lo, rng, today_idx in pending:
+                predictions[ticker] = scaled[offset:offset + len(today_idx)] * rng + lo
+                offset += len(today_idx)
+            pending, pending_windows = [], 0
+
+    columns = {'today': [], 'actual': [], 'raw': [], 'adjusted': [], 'rule': []}
+    by_ticker = {}
+    for ticker, history, _, _, today_idx in prepared:
+        close = history.close.astype(np.float64)
+        today = close[today_idx]
+        actual = close[today_idx + 1]
+        raw = predictions[ticker].astype(np.float64)
+        score, overall, rsi = technical_sentiment(close, history.volume, today_idx)
+        adjusted, rule = adjust_predictions(today, raw, score, overall, rsi, params)
+
+        by_ticker[ticker] = summarize(today, actual, raw, adjusted, rule)['all']
+        for key, values in zip(columns, (today, actual, raw, adjusted, rule)):
+            columns[key].append(values)
+
+    if not prepared:
+        return {'tickers': 0, 'rules': {}, 'by_ticker': {}}
+
+    merged = {key: np.concatenate(values) for key, values in columns.items()}
+    return {
+        'tickers': len(prepared),
+        'days': int(len(merged['rule'])),
+        'rules': summarize(merged['today'], merged['actual'], merged['raw'], merged['adjusted'], merged['rule']),
+        'by_ticker': by_ticker,
+    }
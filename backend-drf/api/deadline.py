@@ -0,0 +1,108 @@
+"""
+Request Deadlines
+
+A latency budget for one /predict/ request. Clients send `deadline_ms`
+(milliseconds from when the request arrived, admission wait included);
+otherwise settings.PREDICTION_DEADLINE['DEFAULT_MS'] applies.
+
+Before each optional stage the view checks that the stage and every stage
+after it in PLAN still fit in the remaining budget, so optional work is given
+up in this order:
+1. charts             - skipped (plot fields are null)
+2. evaluation         - skipped (evaluation and plot_prediction are null)
+3. external sentiment - news and Fear & Greed not received in time are served
+                        from the last good value in cache, or left out
+The forecast itself always runs. Stage costs are exponential moving averages
+of the durations observed in this process, seeded from settings.
+"""
+
+import threading
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+
+DEFAULTS = {
+    'DEFAULT_MS': 8000,
+    'MAX_MS': 60000,
+    # Cost estimates used until the stage has been observed in this process
+    'STAGE_ESTIMATES_MS': {
+        'charts': 1500,
+        'evaluation': 1500,
+        'external_sentiment': 2000,
+        'forecast': 300,
+    },
+}
+
+# Execution order; every optional stage is cheaper to lose than the ones after it
+PLAN = ('charts', 'evaluation', 'external_sentiment', 'forecast')
+
+
+class StageCosts:
+    """Per-stage duration estimates in seconds, shared by all requests in the process."""
+
+    def __init__(self, initial_ms):
+        self._seconds = {stage: ms / 1000 for stage, ms in initial_ms.items()}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        options = {**DEFAULTS, **getattr(settings, 'PREDICTION_DEADLINE', {})}
+        return cls({**DEFAULTS['STAGE_ESTIMATES_MS'], **options['STAGE_ESTIMATES_MS']})
+
+    def estimate(self, stage):
+        return self._seconds.get(stage, 0.0)
+
+    def record(self, stage, seconds):
+        with self._lock:
+            self._seconds[stage] = 0.8 * self._seconds.get(stage, seconds) + 0.2 * seconds
+
+    def snapshot(self):
+        with self._lock:
+            return {stage: round(seconds * 1000) for stage, seconds in self._seconds.items()}
+
+
+stage_costs = StageCosts.from_settings()
+
+
+class Deadline:
+    """Remaining budget of one request plus the parts that were degraded to meet it."""
+
+    def __init__(self, budget_seconds, started_at=None, costs=stage_costs):
+        self.budget_seconds = budget_seconds
+        self.expires_at = (started_at or time.monotonic()) + budget_seconds
+        self.costs = costs
+        self.degraded = {}
+
+    @classmethod
+    def for_request(cls, deadline_ms=None, started_at=None):
+        options = {**DEFAULTS, **getattr(settings, 'PREDICTION_DEADLINE', {})}
+        deadline_ms = min(deadline_ms or options['DEFAULT_MS'], options['MAX_MS'])
+        return cls(deadline_ms / 1000, started_at)
+
+    def remaining(self):
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def reserved_after(self, stage):
+        """Estimated seconds needed by the stages that follow `stage` in PLAN."""
+        return sum(self.costs.estimate(later) for later in PLAN[PLAN.index(stage) + 1:])
+
+    def allows(self, stage):
+        """True when `stage` and everything after it are expected to finish in time."""
+        return self.remaining() >= self.costs.estimate(stage) + self.reserved_after(stage)
+
+    def budget_for(self, stage):
+        """Seconds `stage` may take without eating into the budget of later stages."""
+        return max(0.0, self.remaining() - self.reserved_after(stage))
+
+    def degrade(self, part, how):
+        """Record that `part` of the response was 'skipped', 'stale' or 'unavailable'."""
+        self.degraded[part] = how
+
+    @contextmanager
+    def timed(self, stage):
+        started = time.monotonic()
+        try:
+            yield
+        finally:
+            self.costs.record(stage, time.monotonic() - started)
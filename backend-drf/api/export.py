@@ -0,0 +1,243 @@
+"""
+Bulk Data Export
+
+Streams price history, indicator series and stored predictions for many
+tickers over a date range, one row per ticker and trading day (see COLUMNS).
+
+Tickers are fetched in batches and every ticker is encoded and yielded as
+soon as its rows are ready, so memory stays bounded by one batch however
+large the export is. Output formats:
+1. arrow   - Arrow IPC stream, one record batch per ticker
+2. parquet - Parquet file, one row group per ticker
+3. csv     - plain CSV; also served for arrow/parquet when pyarrow is missing
+
+Indicators are computed over the full fetched history, so the first rows of
+the range already have their 100/200-day averages and RSI.
+"""
+
+import csv
+import io
+from datetime import date
+
+import numpy as np
+
+from .market_data import get_client
+from .models import Prediction
+from .sentiment import rsi_series
+from .shared_data import with_indicators
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # arrow/parquet requests fall back to CSV
+    pa = pq = None
+
+COLUMNS = (
+    'ticker', 'date', 'close', 'volume', 'ma100', 'ma200', 'rsi14',
+    'base_prediction', 'tomorrow_prediction', 'adjustment_rule',
+)
+
+# format -> (content type, file extension)
+FORMATS = {
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+    'csv': ('text/csv', 'csv'),
+}
+
+BATCH_SIZE = 50  # tickers per upstream bulk download
+
+# Smallest upstream period covering the range plus ~200 trading days of warm-up
+WARMUP_DAYS = 300
+PERIODS = (('1y', 365), ('2y', 730), ('5y', 1826), ('10y', 3652))
+
+
+def resolve_format(fmt):
+    """The format that will actually be written: CSV when pyarrow is not installed."""
+    return fmt if pa is not None else 'csv'
+
+
+def period_for(start):
+    days = (date.today() - start).days + WARMUP_DAYS
+    for period, length in PERIODS:
+        if days <= length:
+            return period
+    return 'max'
+
+
+def _stored_predictions(tickers, start, end):
+    """{ticker: {as_of: (base, tomorrow, rule)}}, keeping the latest prediction per day."""
+    stored = {}
+    rows = (Prediction.objects
+            .filter(ticker__in=tickers, as_of__range=(start, end))
+            .order_by('created_at')
+            .values_list('ticker', 'as_of', 'base_prediction', 'tomorrow_prediction', 'adjustment_rule'))
+    for ticker, as_of, base, tomorrow, rule in rows.iterator():
+        stored.setdefault(ticker, {})[as_of] = (base, tomorrow, rule)
+    return stored
+
+
+def ticker_columns(ticker, history, predictions, start, end):
+    """Export columns for one ticker restricted to [start, end]; None when there are no rows."""
+    shared = with_indicators(history)
+    rsi = rsi_series(history.close).astype(np.float32)
+
+    lo = np.searchsorted(history.dates, np.datetime64(start, 'D'), side='left')
+    hi = np.searchsorted(history.dates, np.datetime64(end, 'D'), side='right')
+    if hi <= lo:
+        return None
+    dates = history.dates[lo:hi]
+
+    base = np.full(len(dates), np.nan)
+    tomorrow = np.full(len(dates), np.nan)
+    rule = np.full(len(dates), None, dtype=object)
+    if predictions:
+        as_of = np.array(list(predictions), dtype='datetime64[D]')
+        idx = np.searchsorted(dates, as_of).clip(max=len(dates) - 1)
+        for i, matched, (b, t, r) in zip(idx, dates[idx] == as_of, predictions.values()):
+            if matched:
+                base[i], tomorrow[i], rule[i] = b, t, r
+
+    return {
+        'ticker': np.full(len(dates), ticker, dtype=object),
+        'date': dates,
+        'close': history.close[lo:hi],
+        'volume': history.volume[lo:hi].astype(np.int64),
+        'ma100': shared.ma100[lo:hi],
+        'ma200': shared.ma200[lo:hi],
+        'rsi14': rsi[lo:hi],
+        'base_prediction': base,
+        'tomorrow_prediction': tomorrow,
+        'adjustment_rule': rule,
+    }
+
+
+def export_columns(tickers, start, end, batch_size=BATCH_SIZE):
+    """Yield column dicts ticker by ticker, fetching `batch_size` tickers per upstream call."""
+    client = get_client()
+    period = period_for(start)
+    for i in range(0, len(tickers), batch_size):
+        batch = tickers[i:i + batch_size]
+        # float64 volume: float32 rounds share counts above 2**24
+        histories = client.history_many(batch, period=period, volume_dtype=np.float64, background=True)
+        predictions = _stored_predictions(batch, start, end)
+        for ticker in batch:
+            history = histories.get(ticker)
+            if history is None or len(history) == 0:
+                continue
+            columns = ticker_columns(ticker, history, predictions.get(ticker), start, end)
+            if columns is not None:
+                yield columns
+        del histories
+
+
+class _ChunkSink:
+    """Write-only file object; drain() hands out everything written since the last call."""
+
+    closed = False
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def _arrow_schema():
+    return pa.schema([
+        ('ticker', pa.string()),
+        ('date', pa.date32()),
+        ('close', pa.float32()),
+        ('volume', pa.int64()),
+        ('ma100', pa.float32()),
+        ('ma200', pa.float32()),
+        ('rsi14', pa.float32()),
+        ('base_prediction', pa.float64()),
+        ('tomorrow_prediction', pa.float64()),
+        ('adjustment_rule', pa.string()),
+    ])
+
+
+def _arrow_batch(columns, schema):
+    # from_pandas=True turns NaN (indicator warm-up, days without a prediction) into nulls
+    return pa.record_batch(
+        [pa.array(columns[field.name], type=field.type, from_pandas=True) for field in schema],
+        schema=schema,
+    )
+
+
+def _stream_arrow(column_chunks):
+    schema = _arrow_schema()
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for columns in column_chunks:
+            writer.write_batch(_arrow_batch(columns, schema))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _stream_parquet(column_chunks):
+    schema = _arrow_schema()
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema, compression='zstd') as writer:
+        for columns in column_chunks:
+            writer.write_batch(_arrow_batch(columns, schema))
+            yield sink.drain()
+    yield sink.drain()  # footer
+
+
+def _csv_text(values):
+    values = np.asarray(values)
+    if values.dtype.kind == 'f':
+        # float32 -> str gives the shortest round-trip form (113.38, not 113.37999725)
+        return np.where(np.isnan(values), '', values.astype(str))
+    if values.dtype == object:
+        return ['' if v is None else v for v in values]
+    return values.astype(str)
+
+
+def _stream_csv(column_chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(COLUMNS)
+    for columns in column_chunks:
+        writer.writerows(zip(*(_csv_text(columns[name]) for name in COLUMNS)))
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+WRITERS = {
+    'arrow': _stream_arrow,
+    'parquet': _stream_parquet,
+    'csv': _stream_csv,
+}
+
+
+def stream_export(tickers, start, end, fmt='parquet', batch_size=BATCH_SIZE):
+    """
+    Yield the encoded export in chunks (one or more per ticker).
+    Use resolve_format(fmt) for the format that is actually produced.
+    """
+    column_chunks = export_columns(tickers, start, end, batch_size)
+    for chunk in WRITERS[resolve_format(fmt)](column_chunks):
+        if chunk:
+            yield chunk
@@ -0,0 +1,136 @@
+"""
+Model Serving
+
+Loads the LSTM used by /predict/ once per process. When
+`manage.py quantize_model` has written a variant manifest, the fastest
+reduced-precision variant whose held-out accuracy stays within
+settings.MODEL_ACCURACY_TOLERANCE of the float32 model is served instead.
+Variants built from a different model file than the current one are ignored.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+BASELINE = 'float32'
+
+
+class KerasPredictor:
+    """A .keras model (float32 or float16 weights)."""
+
+    def __init__(self, path):
+        from keras.models import load_model
+        self.model = load_model(path, compile=False)
+        self._lock = threading.Lock()  # predict() keeps per-call state on the model
+        # The first predict() builds the predict function; do it here, not in a request
+        self.predict(np.zeros((1, *self.model.input_shape[1:]), dtype=np.float32))
+
+    def predict(self, x, batch_size=None):
+        with self._lock:
+            return np.asarray(self.model.predict(x, batch_size=batch_size, verbose=0), dtype=np.float32)
+
+
+class TFLitePredictor:
+    """A TensorFlow Lite flatbuffer, e.g. the int8 dynamic-range quantized model."""
+
+    def __init__(self, path):
+        import tensorflow as tf
+        self.interpreter = tf.lite.Interpreter(model_path=str(path))
+        self._input = self.interpreter.get_input_details()[0]['index']
+        self._output = self.interpreter.get_output_details()[0]['index']
+        self._shape = None
+        self._lock = threading.Lock()  # the interpreter is not thread-safe
+
+    def predict(self, x, batch_size=None):
+        x = np.ascontiguousarray(x, dtype=np.float32)
+        with self._lock:
+            if self._shape != x.shape:
+                self.interpreter.resize_tensor_input(self._input, x.shape)
+                self.interpreter.allocate_tensors()
+                self._shape = x.shape
+            self.interpreter.set_tensor(self._input, x)
+            self.interpreter.invoke()
+            return self.interpreter.get_tensor(self._output).copy()
+
+
+LOADERS = {
+    'keras': KerasPredictor,
+    'tflite': TFLitePredictor,
+}
+
+
+def load_predictor(fmt, path):
+    return LOADERS[fmt](path)
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def select_variant(manifest, tolerance):
+    """
+    Fastest variant whose MAPE and directional accuracy stay within `tolerance`
+    (percentage points) of the float32 baseline. Returns (variant, baseline).
+    """
+    variants = manifest['variants']
+    baseline = next(v for v in variants if v['name'] == BASELINE)
+    eligible = [
+        v for v in variants
+        if v['mape'] - baseline['mape'] <= tolerance['MAPE_INCREASE']
+        and baseline['directional_accuracy'] - v['directional_accuracy'] <= tolerance['DIRECTIONAL_DROP']
+    ]
+    return min(eligible, key=lambda v: v['latency_ms']), baseline
+
+
+def _load_serving_predictor():
+    model_path = settings.PREDICTION_MODEL_PATH
+    manifest_path = Path(settings.MODEL_VARIANTS_MANIFEST)
+
+    if manifest_path.exists():
+        try:
+            manifest = json.loads(manifest_path.read_text())
+            if manifest.get('source_sha256') != file_sha256(model_path):
+                logger.warning("Model variant manifest %s was built from another model; ignoring it", manifest_path)
+            else:
+                variant, baseline = select_variant(manifest, settings.MODEL_ACCURACY_TOLERANCE)
+                if variant['name'] != BASELINE:
+                    predictor = load_predictor(variant['format'], manifest_path.parent / variant['path'])
+                    logger.info(
+                        "Serving %s model variant: %.1f ms vs %.1f ms per forecast, %.0f KB less memory, "
+                        "MAPE %+.3f pts, directional accuracy %+.2f pts",
+                        variant['name'], variant['latency_ms'], baseline['latency_ms'],
+                        (baseline['memory_bytes'] - variant['memory_bytes']) / 1024,
+                        variant['mape'] - baseline['mape'],
+                        variant['directional_accuracy'] - baseline['directional_accuracy'],
+                    )
+                    return predictor
+                logger.info("float32 model is the fastest variant within accuracy tolerance; serving it")
+        except Exception:
+            logger.exception("Could not load model variant from %s; serving float32 model", manifest_path)
+
+    return KerasPredictor(model_path)
+
+
+_predictor = None
+_predictor_lock = threading.Lock()
+
+
+def get_predictor():
+    """Process-wide predictor for the serving model (loaded on first use)."""
+    global _predictor
+    if _predictor is None:
+        with _predictor_lock:
+            if _predictor is None:
+                _predictor = _load_serving_predictor()
+    return _predictor
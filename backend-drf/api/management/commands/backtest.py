@@ -0,0 +1,57 @@
+"""
+Backtest the sentiment-adjustment rules over full histories.
+
+    python manage.py backtest TSLA AAPL MSFT --days 750
+    python manage.py backtest TSLA --param large_move_pct=4 --param conservative_factor=0.5
+
+Prints raw-vs-adjusted MAPE and directional accuracy per rule as JSON.
+Rule parameters are listed in api/adjustment.py (DEFAULT_PARAMS).
+"""
+
+import json
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from keras.models import load_model
+
+from api.adjustment import DEFAULT_PARAMS
+from api.backtest import run_backtest
+from api.market_data import get_client
+
+
+class Command(BaseCommand):
+    help = "Replay the sentiment-adjustment rules over history and report error per rule."
+
+    def add_arguments(self, parser):
+        parser.add_argument('tickers', nargs='+')
+        parser.add_argument('--period', default='10y', help="History to download per ticker")
+        parser.add_argument('--days', type=int, help="Only score the most recent N days of each ticker")
+        parser.add_argument('--batch-size', type=int, default=1024, help="LSTM inference batch size")
+        parser.add_argument('--param', action='append', default=[], metavar='NAME=VALUE',
+                            help="Override a rule parameter (repeatable)")
+        parser.add_argument('--output', help="Also write the JSON report to this file")
+
+    def handle(self, *args, **options):
+        params = {}
+        for item in options['param']:
+            name, _, value = item.partition('=')
+            if name not in DEFAULT_PARAMS or not value:
+                raise CommandError(f"Unknown parameter '{item}'. Choose from: {', '.join(DEFAULT_PARAMS)}")
+            params[name] = float(value)
+
+        tickers = [t.upper() for t in options['tickers']]
+        histories = get_client().history_many(tickers, period=options['period'], background=True)
+        missing = [t for t in tickers if len(histories[t]) == 0]
+        if missing:
+            self.stderr.write(f"No data for: {', '.join(missing)}")
+
+        model = load_model(settings.PREDICTION_MODEL_PATH)
+        report = run_backtest(histories, model, days=options['days'], params=params,
+                              batch_size=options['batch_size'])
+        report['params'] = {**DEFAULT_PARAMS, **params}
+
+        output = json.dumps(report, indent=2)
+        self.stdout.write(output)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
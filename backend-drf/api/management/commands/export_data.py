@@ -0,0 +1,57 @@
+"""
+Export price history, indicators and stored predictions to a file.
+
+    python manage.py export_data TSLA AAPL MSFT --start 2020-01-01 --output prices.parquet
+    python manage.py export_data --tickers-file sp500.txt --start 2015-01-01 --format arrow --output sp500.arrows
+
+Same data and formats as GET /api/v1/export/ (api/export.py); rows are written
+ticker by ticker, so memory use does not grow with the number of tickers.
+"""
+
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.export import BATCH_SIZE, FORMATS, resolve_format, stream_export
+
+
+class Command(BaseCommand):
+    help = "Stream price history, indicator series and stored predictions for many tickers to a file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('tickers', nargs='*')
+        parser.add_argument('--tickers-file', help="File with one ticker per line")
+        parser.add_argument('--start', type=date.fromisoformat, required=True, help="YYYY-MM-DD")
+        parser.add_argument('--end', type=date.fromisoformat, default=date.today(), help="YYYY-MM-DD (default today)")
+        parser.add_argument('--format', choices=list(FORMATS), default='parquet')
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help="Tickers per upstream download")
+        parser.add_argument('--output', help="Output file (default stdout)")
+
+    def handle(self, *args, **options):
+        tickers = list(options['tickers'])
+        if options['tickers_file']:
+            with open(options['tickers_file']) as f:
+                tickers += [line.strip() for line in f if line.strip() and not line.startswith('#')]
+        tickers = list(dict.fromkeys(t.upper() for t in tickers))
+        if not tickers:
+            raise CommandError("Give tickers as arguments or with --tickers-file")
+        if options['start'] > options['end']:
+            raise CommandError("--start must not be after --end")
+
+        fmt = resolve_format(options['format'])
+        if fmt != options['format']:
+            self.stderr.write(f"pyarrow is not installed; writing CSV instead of {options['format']}")
+
+        chunks = stream_export(tickers, options['start'], options['end'], fmt, options['batch_size'])
+        written = 0
+        if options['output']:
+            with open(options['output'], 'wb') as out:
+                for chunk in chunks:
+                    out.write(chunk)
+                    written += len(chunk)
+            self.stderr.write(f"Wrote {written / 1024:.0f} KB of {fmt} to {options['output']}")
+        else:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
@@ -0,0 +1,255 @@
+"""
+Concurrent load test for token/ and predict/.
+
+By default the command starts local stand-ins for yfinance and Fear & Greed
+(api/upstream_stubs.py, backed by Resources/*.csv), serves the app in-process
+on a threaded WSGI server pointed at them, and drives it. With --target it
+drives an already running deployment instead; start that deployment with
+MARKET_DATA_BASE_URL / FEAR_GREED_URL pointing at `loadtest --stubs-only`.
+
+Each run registers one account per client (loadtest-<run>-<n>) with a random
+password. In-process runs delete them, and the predictions they stored,
+afterwards; after --target runs, remove them on the deployment with
+`python manage.py loadtest --cleanup`.
+
+    python manage.py migrate
+    python manage.py loadtest --concurrency 8 --requests 200 --tickers TSLA:3,AAPL:1 --output run.json
+
+Results (throughput, p50/p95/p99 latency, error rate per endpoint) are
+printed as JSON so runs can be compared across configurations and versions.
+"""
+
+import json
+import random
+import secrets
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.test.utils import override_settings
+
+from api.models import Prediction
+from api.upstream_stubs import start_stub_server
+
+USERNAME_PREFIX = 'loadtest-'
+
+
+def delete_accounts(prefix=USERNAME_PREFIX):
+    """
+    Delete load-test accounts and the forecasts they stored; the forecasts are
+    made from stand-in data and would otherwise show up in /export/.
+    Returns (predictions, users) deleted.
+    """
+    users = get_user_model().objects.filter(username__startswith=prefix)
+    predictions, _ = Prediction.objects.filter(user__in=users).delete()
+    deleted = users.count()
+    users.delete()
+    return predictions, deleted
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+def parse_ticker_mix(value):
+    """'TSLA:3,AAPL:1' -> (['TSLA', 'AAPL'], [0.75, 0.25])"""
+    tickers, weights = [], []
+    for item in value.split(','):
+        name, _, weight = item.strip().partition(':')
+        if name:
+            tickers.append(name.upper())
+            weights.append(float(weight or 1))
+    if not tickers:
+        raise CommandError("--tickers must name at least one ticker")
+    total = sum(weights)
+    return tickers, [w / total for w in weights]
+
+
+def summarize(samples, elapsed):
+    """samples: list of (latency_seconds, status_code, ok)"""
+    if not samples:
+        return {'requests': 0}
+    latencies = np.array([s[0] for s in samples]) * 1000
+    errors = sum(1 for s in samples if not s[2])
+    status_codes = {}
+    for _, code, _ in samples:
+        status_codes[str(code)] = status_codes.get(str(code), 0) + 1
+    return {
+        'requests': len(samples),
+        'throughput_rps': round(len(samples) / elapsed, 2) if elapsed > 0 else None,
+        'latency_ms': {
+            'mean': round(float(latencies.mean()), 1),
+            'p50': round(float(np.percentile(latencies, 50)), 1),
+            'p95': round(float(np.percentile(latencies, 95)), 1),
+            'p99': round(float(np.percentile(latencies, 99)), 1),
+            'max': round(float(latencies.max()), 1),
+        },
+        'errors': errors,
+        'error_rate': round(errors / len(samples), 4),
+        'status_codes': status_codes,
+    }
+
+
+class Command(BaseCommand):
+    help = "Drive token/ and predict/ at a given concurrency and report throughput and latency percentiles."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', help="Base URL of a running deployment (default: serve in-process)")
+        parser.add_argument('--concurrency', type=int, default=4, help="Concurrent clients")
+        parser.add_argument('--requests', type=int, default=50, help="Total operations across all clients")
+        parser.add_argument('--tickers', default='TSLA', help="Weighted ticker mix, e.g. TSLA:3,AAPL:1")
+        parser.add_argument('--token-ratio', type=float, default=0.1,
+                            help="Fraction of operations that re-login via token/ instead of calling predict/")
+        parser.add_argument('--stub-latency', type=float, default=0.0, help="Seconds of delay per stand-in response")
+        parser.add_argument('--rate-limit', type=float,
+                            help="Override MARKET_DATA rate limit (req/s, 0 disables) for the in-process app")
+        parser.add_argument('--timeout', type=float, default=120, help="Per-request client timeout in seconds")
+        parser.add_argument('--label', default='', help="Free-form name for this run in the report")
+        parser.add_argument('--output', help="Also write the JSON report to this file")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--stubs-only', action='store_true',
+                            help="Only run the upstream stand-ins (for an external deployment) until interrupted")
+        parser.add_argument('--stub-port', type=int, default=0, help="Port for the stand-ins (default: random)")
+        parser.add_argument('--cleanup', action='store_true',
+                            help="Delete the loadtest-* accounts and their predictions in this deployment's database and exit")
+
+    def handle(self, *args, **options):
+        if options['cleanup']:
+            predictions, users = delete_accounts()
+            self.stdout.write(f"Deleted {users} loadtest accounts and {predictions} predictions")
+            return
+
+        stubs = start_stub_server(port=options['stub_port'], latency=options['stub_latency'])
+
+        if options['stubs_only']:
+            self.stdout.write(f"Upstream stand-ins on {stubs.url}")
+            self.stdout.write(f"  MARKET_DATA_BASE_URL={stubs.url} FEAR_GREED_URL={stubs.url}/fng/")
+            try:
+                while True:
+                    time.sleep(3600)
+            except KeyboardInterrupt:
+                stubs.shutdown()
+                return
+
+        server = None
+        overrides = None
+        shared_dir = None
+        run_prefix = f'{USERNAME_PREFIX}{secrets.token_hex(4)}-'
+        try:
+            if options['target']:
+                base_url = options['target'].rstrip('/')
+            else:
+                market_data = {**getattr(settings, 'MARKET_DATA', {}),
+                               'BASE_URL': stubs.url, 'FEAR_GREED_URL': f'{stubs.url}/fng/'}
+                if options['rate_limit'] is not None:
+                    market_data['RATE_LIMIT_PER_SEC'] = options['rate_limit']
+                # Keep stand-in histories out of the shared store that real workers read
+                shared_dir = tempfile.TemporaryDirectory(prefix='loadtest-shared-')
+                shared_data = {**getattr(settings, 'SHARED_DATA', {}), 'DIR': shared_dir.name}
+                overrides = override_settings(MARKET_DATA=market_data, SHARED_DATA=shared_data)
+                overrides.enable()
+
+                server = ThreadedWSGIServer(('127.0.0.1', 0), QuietHandler)
+                server.daemon_threads = True
+                server.set_app(get_wsgi_application())
+                threading.Thread(target=server.serve_forever, daemon=True).start()
+                base_url = f'http://127.0.0.1:{server.server_port}'
+
+            report = self.run(f'{base_url}/api/v1', run_prefix, options)
+            report['target'] = options['target'] or 'in-process'
+        finally:
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+                delete_accounts(run_prefix)
+            if overrides is not None:
+                overrides.disable()
+            if shared_dir is not None:
+                shared_dir.cleanup()
+            stubs.shutdown()
+
+        output = json.dumps(report, indent=2)
+        self.stdout.write(output)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                f.write(output + '\n')
+
+    def run(self, api_url, run_prefix, options):
+        tickers, weights = parse_ticker_mix(options['tickers'])
+        concurrency = max(1, options['concurrency'])
+        timeout = options['timeout']
+        samples = {'token': [], 'predict': []}
+        samples_lock = threading.Lock()
+        counter = iter(range(options['requests']))
+        counter_lock = threading.Lock()
+        password = secrets.token_urlsafe(16)
+
+        def record(endpoint, started, response=None):
+            latency = time.perf_counter() - started
+            if response is None:
+                sample = (latency, 'exception', False)
+            else:
+                try:
+                    body_error = 'error' in response.json()
+                except ValueError:
+                    body_error = True
+                sample = (latency, response.status_code, response.ok and not body_error)
+            with samples_lock:
+                samples[endpoint].append(sample)
+
+        def timed_post(session, endpoint, path, payload):
+            started = time.perf_counter()
+            try:
+                response = session.post(f'{api_url}/{path}', json=payload, timeout=timeout)
+            except requests.RequestException:
+                record(endpoint, started)
+                return None
+            record(endpoint, started, response)
+            return response
+
+        def login(session, username):
+            response = timed_post(session, 'token', 'token/', {'username': username, 'password': password})
+            if response is not None and response.ok:
+                session.headers['Authorization'] = f"Bearer {response.json()['access']}"
+
+        def client(index):
+            # One account per client so per-user admission limits don't serialize the run
+            rng = random.Random(options['seed'] + index)
+            username = f'{run_prefix}{index}'
+            with requests.Session() as session:
+                session.post(f'{api_url}/register/', timeout=timeout, json={
+                    'username': username, 'password': password, 'password_confirm': password,
+                })
+                login(session, username)
+                while True:
+                    with counter_lock:
+                        if next(counter, None) is None:
+                            return
+                    if rng.random() < options['token_ratio']:
+                        login(session, username)
+                    else:
+                        ticker = rng.choices(tickers, weights)[0]
+                        timed_post(session, 'predict', 'predict/', {'ticker': ticker})
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(client, range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+        return {
+            'label': options['label'],
+            'concurrency': concurrency,
+            'operations': options['requests'],
+            'ticker_mix': dict(zip(tickers, [round(w, 3) for w in weights])),
+            'duration_seconds': round(elapsed, 2),
+            'endpoints': {endpoint: summarize(rows, elapsed) for endpoint, rows in samples.items()},
+        }
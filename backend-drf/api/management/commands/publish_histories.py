@@ -0,0 +1,45 @@
+"""
+Publish price histories into the cross-worker shared store (api/shared_data.py).
+
+    python manage.py publish_histories TSLA AAPL MSFT --interval 300
+
+Run once after deploy to warm every worker, or with --interval as a sidecar
+that keeps the histories fresh; workers pick up each new bar on their next read.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from api.market_data import get_client
+from api.shared_data import get_store, history_key
+
+
+class Command(BaseCommand):
+    help = "Fetch histories in bulk and publish them to shared memory for all workers."
+
+    def add_arguments(self, parser):
+        parser.add_argument('tickers', nargs='+')
+        parser.add_argument('--period', default='10y')
+        parser.add_argument('--interval', type=int, default=0, help="Republish every N seconds (0 = once)")
+
+    def handle(self, *args, **options):
+        store = get_store()
+        if store is None:
+            raise CommandError("Shared data is disabled (SHARED_DATA['ENABLED'] is False)")
+
+        tickers = [t.upper() for t in options['tickers']]
+        period = options['period']
+        client = get_client()
+        while True:
+            histories = client.history_many(tickers, period=period, background=True)
+            for ticker, history in histories.items():
+                if len(history) == 0:
+                    self.stderr.write(f"No data for {ticker}")
+                    continue
+                store.publish(history_key(ticker, period, client.base_url), history)
+                self.stdout.write(f"Published {ticker}: {len(history)} bars through {history.dates[-1]}")
+
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,161 @@
+"""
+Build and evaluate reduced-precision variants of the prediction model.
+
+    python manage.py quantize_model TSLA AAPL MSFT --days 250
+
+Variants:
+- float32: the original model (baseline)
+- float16: same architecture with float16 weights and compute
+- int8:    TensorFlow Lite dynamic-range quantization (int8 weights);
+           skipped when TensorFlow is not installed
+
+Each variant is scored walk-forward on the most recent --days of each ticker
+(MAPE, directional accuracy) and timed on a single forecast. The results go
+to settings.MODEL_VARIANTS_MANIFEST; the serving path (api/inference.py)
+picks the fastest variant within settings.MODEL_ACCURACY_TOLERANCE.
+"""
+
+import gc
+import json
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from api.backtest import prepare_windows, score_forecast
+from api.inference import BASELINE, file_sha256, load_predictor
+from api.market_data import get_client
+from api.series import WINDOW
+
+
+def _rss():
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        return 0
+
+
+def build_float16(model, path):
+    config = model.get_config()
+    for layer in config['layers']:
+        if layer['class_name'] == 'InputLayer':
+            continue
+        layer['config']['dtype'] = 'float16'
+        # Weights are copied below, so skip (and avoid float16-incompatible) initializers
+        for key in layer['config']:
+            if key.endswith('_initializer'):
+                layer['config'][key] = 'zeros'
+
+    half = model.__class__.from_config(config)
+    half.set_weights([w.astype(np.float16) for w in model.get_weights()])
+    half.save(path)
+
+
+def build_int8(model, path):
+    import tensorflow as tf
+
+    with tempfile.TemporaryDirectory() as saved_model_dir:
+        model.export(saved_model_dir)
+        converter = tf.lite.TFLiteConverter.from_saved_model(saved_model_dir)
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]  # no representative data -> dynamic range
+        converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS, tf.lite.OpsSet.SELECT_TF_OPS]
+        Path(path).write_bytes(converter.convert())
+
+
+class Command(BaseCommand):
+    help = "Create float16/int8 variants of the prediction model and record their accuracy and latency."
+
+    def add_arguments(self, parser):
+        parser.add_argument('tickers', nargs='+', help="Held-out tickers for walk-forward evaluation")
+        parser.add_argument('--period', default='10y')
+        parser.add_argument('--days', type=int, default=250, help="Most recent days of each ticker to score")
+        parser.add_argument('--repeats', type=int, default=20, help="Timed single-forecast runs per variant")
+
+    def handle(self, *args, **options):
+        from keras.models import load_model
+
+        source = Path(settings.PREDICTION_MODEL_PATH)
+        manifest_path = Path(settings.MODEL_VARIANTS_MANIFEST)
+        out_dir = manifest_path.parent
+        out_dir.mkdir(parents=True, exist_ok=True)
+
+        tickers = [t.upper() for t in options['tickers']]
+        histories = get_client().history_many(tickers, period=options['period'], background=True)
+        windows = [prepare_windows(h.close, options['days']) + (h.close,)
+                   for h in histories.values() if len(h) > WINDOW + 1]
+        if not windows:
+            raise CommandError("No usable history for the given tickers")
+
+        model = load_model(source, compile=False)
+        candidates = [(BASELINE, 'keras', source)]
+
+        float16_path = out_dir / f'{source.stem}.float16.keras'
+        build_float16(model, float16_path)
+        candidates.append(('float16', 'keras', float16_path))
+
+        int8_path = out_dir / f'{source.stem}.int8.tflite'
+        try:
+            build_int8(model, int8_path)
+            candidates.append(('int8', 'tflite', int8_path))
+        except ImportError:
+            self.stderr.write("TensorFlow is not installed; skipping the int8 TFLite variant")
+        except Exception as e:
+            self.stderr.write(f"int8 conversion failed ({e}); skipping the int8 variant")
+        del model
+        gc.collect()
+
+        variants = []
+        for name, fmt, path in candidates:
+            gc.collect()
+            rss_before = _rss()
+            predictor = load_predictor(fmt, path)
+            memory_bytes = max(_rss() - rss_before, 0) or Path(path).stat().st_size
+
+            today, actual, predicted = [], [], []
+            for x, lo, rng, today_idx, close in windows:
+                scaled = predictor.predict(x[..., np.newaxis], batch_size=1024).ravel()
+                predicted.append(scaled * rng + lo)
+                today.append(close[today_idx])
+                actual.append(close[today_idx + 1])
+            mape, directional = score_forecast(np.concatenate(today), np.concatenate(actual),
+                                               np.concatenate(predicted))
+
+            # Serving cost: one 100-day window, as in the tomorrow forecast
+            single = windows[0][0][-1:][..., np.newaxis]
+            predictor.predict(single)
+            timings = []
+            for _ in range(options['repeats']):
+                started = time.perf_counter()
+                predictor.predict(single)
+                timings.append((time.perf_counter() - started) * 1000)
+
+            variants.append({
+                'name': name,
+                'format': fmt,
+                'path': None if name == BASELINE else Path(path).name,
+                'file_bytes': Path(path).stat().st_size,
+                'memory_bytes': memory_bytes,
+                'latency_ms': round(float(np.median(timings)), 3),
+                'mape': mape,
+                'directional_accuracy': directional,
+            })
+            del predictor
+
+        manifest = {
+            'source': source.name,
+            'source_sha256': file_sha256(source),
+            'tickers': tickers,
+            'days': options['days'],
+            'variants': variants,
+        }
+        manifest_path.write_text(json.dumps(manifest, indent=2) + '\n')
+
+        self.stdout.write(f"{'variant':<10}{'latency ms':>12}{'memory KB':>12}{'MAPE %':>10}{'dir acc %':>11}")
+        for v in variants:
+            self.stdout.write(f"{v['name']:<10}{v['latency_ms']:>12}{v['memory_bytes'] // 1024:>12}"
+                              f"{v['mape']:>10}{v['directional_accuracy']:>11}")
+        self.stdout.write(f"Manifest written to {manifest_path}")
@@ -0,0 +1,352 @@
+"""
+Market Data Client
+
+Single entry point for every upstream market-data call in the project:
+1. Price history (single ticker and bulk multi-ticker downloads) - yfinance
+2. Stock news headlines - yfinance
+3. Fear & Greed Index - Alternative.me API
+
+All calls share pooled keep-alive HTTP sessions, pass through a token-bucket
+rate limiter and are retried with exponential backoff on transient failures.
+Bulk work (exports, backtests, publishing) takes its tokens in the background,
+so interactive /predict/ fetches are never queued behind it.
+Setting MARKET_DATA['BASE_URL'] points history and news at a local HTTP
+stand-in instead of Yahoo (used by tests and load testing).
+"""
+
+import logging
+import os
+import random
+import threading
+import time
+from typing import NamedTuple
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'BASE_URL': '',
+    'FEAR_GREED_URL': 'https://api.alternative.me/fng/',
+    'RATE_LIMIT_PER_SEC': 2.0,
+    'RATE_LIMIT_BURST': 5,
+    'MAX_RETRIES': 3,
+    'BACKOFF_FACTOR': 0.5,
+    'POOL_SIZE': 10,
+    'TIMEOUT': 10,
+}
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# Configure yfinance cache to a writable location
+cache_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.yf_cache')
+os.makedirs(cache_dir, exist_ok=True)
+
+
+class MarketDataError(Exception):
+    """Raised when an upstream market-data call fails after all retries."""
+
+
+class PriceHistory(NamedTuple):
+    """
+    Daily bars as contiguous arrays, oldest first.
+    dates is datetime64[D]; close and volume are float32 with NaN rows dropped
+    (volume is float64 when requested with volume_dtype, for exact share counts).
+    """
+    dates: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+
+    def __len__(self):
+        return len(self.close)
+
+
+EMPTY_HISTORY = PriceHistory(
+    np.empty(0, dtype='datetime64[D]'), np.empty(0, dtype=np.float32), np.empty(0, dtype=np.float32)
+)
+
+
+def _price_history(dates, close, volume, volume_dtype=np.float32):
+    close = np.asarray(close, dtype=np.float32)
+    volume = np.asarray(volume, dtype=volume_dtype)
+    valid = ~(np.isnan(close) | np.isnan(volume))
+    if valid.all():
+        return PriceHistory(dates, np.ascontiguousarray(close), np.ascontiguousarray(volume))
+    return PriceHistory(dates[valid], close[valid], volume[valid])
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket.
+    Refills at `rate` tokens per second up to `burst` tokens. Callers that find
+    the bucket empty reserve a future token and sleep until it is available,
+    so bursts are smoothed out instead of rejected.
+    Background callers never reserve ahead: they take tokens one by one as they
+    refill, so a foreground caller waits at most for one token behind them.
+    """
+
+    def __init__(self, rate, burst):
+        self.rate = float(rate)
+        self.burst = float(burst)
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def acquire(self, tokens=1, background=False):
+        """Take `tokens`, sleeping as needed; returns the seconds waited."""
+        if self.rate <= 0:
+            return 0.0
+        if background:
+            return self._acquire_background(tokens)
+
+        with self._lock:
+            self._refill()
+            self._tokens -= tokens
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def _acquire_background(self, tokens):
+        waited = 0.0
+        while tokens > 0:
+            with self._lock:
+                self._refill()
+                taken = min(tokens, max(0, int(self._tokens)))
+                self._tokens -= taken
+                tokens -= taken
+                # Sleep until one whole token is free again
+                wait = (1 - self._tokens) / self.rate if tokens > 0 else 0.0
+            if wait > 0:
+                time.sleep(wait)
+                waited += wait
+        return waited
+
+
+def _retryable_errors():
+    errors = [requests.ConnectionError, requests.Timeout]
+    try:
+        from curl_cffi.requests.exceptions import RequestException as CurlRequestException
+        errors.append(CurlRequestException)
+    except ImportError:
+        pass
+    try:
+        from yfinance.exceptions import YFRateLimitError
+        errors.append(YFRateLimitError)
+    except ImportError:
+        pass
+    return tuple(errors)
+
+
+def _is_retryable(exc):
+    response = getattr(exc, 'response', None)
+    status_code = getattr(response, 'status_code', None)
+    if status_code is not None:
+        return status_code in RETRY_STATUSES
+    return isinstance(exc, _retryable_errors())
+
+
+def _normalize_article(article):
+    """yfinance nests article fields under 'content'; flatten so 'title' is always top level."""
+    content = article.get('content')
+    if isinstance(content, dict):
+        article = {**content, **{k: v for k, v in article.items() if k != 'content'}}
+    article.setdefault('title', '')
+    return article
+
+
+def _history_from_payload(payload, volume_dtype=np.float32):
+    dates = np.asarray(payload.get('date', []), dtype='datetime64[D]')
+    return _price_history(dates, payload.get('close', []), payload.get('volume', []), volume_dtype)
+
+
+def _history_from_frame(df, ticker, volume_dtype=np.float32):
+    """Convert a yfinance DataFrame to PriceHistory without keeping any pandas copies around."""
+    if df is None or df.empty:
+        return EMPTY_HISTORY
+    if 'Close' not in df.columns:
+        raise MarketDataError(f"Invalid data structure for ticker '{ticker}'. Missing Close price data.")
+
+    index = df.index
+    if getattr(index, 'tz', None) is not None:
+        index = index.tz_localize(None)
+    dates = index.values.astype('datetime64[D]')
+    volume = df['Volume'].to_numpy(dtype=volume_dtype) if 'Volume' in df.columns else np.zeros(len(df), dtype=volume_dtype)
+    return _price_history(dates, df['Close'].to_numpy(dtype=np.float32), volume, volume_dtype)
+
+
+class MarketDataClient:
+    """
+    Rate-limited, pooled client for price history, news and Fear & Greed data.
+    One instance is shared per process; use get_client() to obtain it.
+    """
+
+    def __init__(self, base_url='', fear_greed_url=DEFAULTS['FEAR_GREED_URL'],
+                 rate_limit_per_sec=DEFAULTS['RATE_LIMIT_PER_SEC'], rate_limit_burst=DEFAULTS['RATE_LIMIT_BURST'],
+                 max_retries=DEFAULTS['MAX_RETRIES'], backoff_factor=DEFAULTS['BACKOFF_FACTOR'],
+                 pool_size=DEFAULTS['POOL_SIZE'], timeout=DEFAULTS['TIMEOUT']):
+        self.base_url = base_url.rstrip('/')
+        self.fear_greed_url = fear_greed_url
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.timeout = timeout
+        self.limiter = RateLimiter(rate_limit_per_sec, rate_limit_burst)
+
+        # Plain HTTP (Fear & Greed, local stand-in) shares one pooled session
+        self.http = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.http.mount('http://', adapter)
+        self.http.mount('https://', adapter)
+
+        self._yf_session = None
+        self._yf_lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        options = {**DEFAULTS, **getattr(settings, 'MARKET_DATA', {})}
+        return cls(
+            base_url=options['BASE_URL'],
+            fear_greed_url=options['FEAR_GREED_URL'],
+            rate_limit_per_sec=options['RATE_LIMIT_PER_SEC'],
+            rate_limit_burst=options['RATE_LIMIT_BURST'],
+            max_retries=options['MAX_RETRIES'],
+            backoff_factor=options['BACKOFF_FACTOR'],
+            pool_size=options['POOL_SIZE'],
+            timeout=options['TIMEOUT'],
+        )
+
+    # ---------- plumbing ----------
+
+    def _yfinance(self):
+        """Import yfinance lazily and hand it one shared keep-alive curl_cffi session."""
+        import yfinance as yf
+
+        with self._yf_lock:
+            if self._yf_session is None:
+                yf.set_tz_cache_location(cache_dir)
+                try:
+                    from curl_cffi import requests as curl_requests
+                    self._yf_session = curl_requests.Session(impersonate='chrome')
+                except ImportError:
+                    self._yf_session = False  # let yfinance manage its own session
+        return yf, (self._yf_session or None)
+
+    def _call(self, fn, *args, tokens=1, retries=None, background=False, **kwargs):
+        """
+        Run an upstream call under the rate limiter, retrying transient failures
+        with backoff (`retries` overrides max_retries, e.g. 0 for callers on a deadline).
+        `background` marks bulk calls that yield the rate limit to interactive ones.
+        """
+        retries = self.max_retries if retries is None else retries
+        for attempt in range(retries + 1):
+            self.limiter.acquire(tokens, background=background)
+            try:
+                return fn(*args, **kwargs)
+            except Exception as e:
+                if attempt >= retries or not _is_retryable(e):
+                    raise MarketDataError(str(e)) from e
+                delay = self.backoff_factor * (2 ** attempt) * (1 + random.random())
+                logger.warning("Market data call failed (%s), retrying in %.2fs", e, delay)
+                time.sleep(delay)
+
+    def _get_json(self, url, params=None, timeout=None):
+        response = self.http.get(url, params=params, timeout=timeout or self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    # ---------- price history ----------
+
+    def history(self, ticker, period='10y'):
+        """Daily history for one ticker as a float32 PriceHistory."""
+        return self.history_many([ticker], period=period)[ticker]
+
+    def history_many(self, tickers, period='10y', volume_dtype=np.float32, background=False):
+        """
+        Bulk download of daily history for several tickers in one batch.
+        Returns a dict mapping each ticker to its PriceHistory (empty if no data).
+        float32 volumes are exact only up to 2**24 shares; pass np.float64 where
+        volumes are reported rather than compared. Bulk jobs pass background=True
+        so they do not hold up interactive requests (see RateLimiter).
+        """
+        tickers = list(dict.fromkeys(tickers))
+        if not tickers:
+            return {}
+
+        if self.base_url:
+            payload = self._call(
+                self._get_json, f'{self.base_url}/history',
+                params={'symbols': ','.join(tickers), 'period': period},
+                tokens=len(tickers), background=background,
+            )
+            return {ticker: _history_from_payload(payload.get(ticker, {}), volume_dtype) for ticker in tickers}
+
+        yf, session = self._yfinance()
+        if len(tickers) == 1:
+            df = self._call(yf.Ticker(tickers[0], session=session).history, period=period, background=background)
+            return {tickers[0]: _history_from_frame(df, tickers[0], volume_dtype)}
+
+        df = self._call(
+            yf.download, tickers, period=period, group_by='ticker', auto_adjust=True,
+            threads=True, progress=False, session=session, tokens=len(tickers), background=background,
+        )
+        histories = {}
+        for ticker in tickers:
+            if df is None or df.empty or ticker not in df.columns.get_level_values(0):
+                histories[ticker] = EMPTY_HISTORY
+            else:
+                histories[ticker] = _history_from_frame(df[ticker], ticker, volume_dtype)
+        return histories
+
+    # ---------- news & market sentiment ----------
+
+    def news(self, ticker, timeout=None, retries=None):
+        """
+        Recent news articles for a ticker; every article has a top-level 'title'.
+        `timeout` applies to the HTTP upstream (yfinance uses its own).
+        """
+        if self.base_url:
+            articles = self._call(self._get_json, f'{self.base_url}/news', params={'symbol': ticker},
+                                  timeout=timeout, retries=retries)
+        else:
+            yf, session = self._yfinance()
+            articles = self._call(lambda: yf.Ticker(ticker, session=session).news, retries=retries)
+        return [_normalize_article(article) for article in (articles or [])]
+
+    def fear_greed(self, limit=1, timeout=5, retries=None):
+        """Raw Fear & Greed Index payload from Alternative.me (or its stand-in)."""
+        return self._call(self._get_json, self.fear_greed_url, params={'limit': limit}, timeout=timeout,
+                          retries=retries)
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Process-wide MarketDataClient built from settings.MARKET_DATA."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = MarketDataClient.from_settings()
+    return _client
+
+
+@receiver(setting_changed)
+def reset_client(setting=None, **kwargs):
+    """Drop the shared client so the next get_client() picks up changed settings."""
+    global _client
+    if setting in (None, 'MARKET_DATA'):
+        with _client_lock:
+            _client = None
@@ -0,0 +1,36 @@
+# Generated by Django 6.0 on 2026-10-19 19:35
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Prediction',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ticker', models.CharField(max_length=20)),
+                ('as_of', models.DateField(help_text='Date of the last close the forecast was made from')),
+                ('today_price', models.FloatField()),
+                ('base_prediction', models.FloatField()),
+                ('tomorrow_prediction', models.FloatField()),
+                ('adjustment_rule', models.CharField(max_length=40)),
+                ('sentiment_score', models.FloatField()),
+                ('overall_sentiment', models.CharField(max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['ticker', 'as_of'], name='api_predict_ticker_82f338_idx')],
+            },
+        ),
+    ]
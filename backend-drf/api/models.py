@@ -1,3 +1,22 @@
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+class Prediction(models.Model):
+    """A next-day forecast served by /predict/, kept for export and later scoring."""
+    ticker = models.CharField(max_length=20)
+    as_of = models.DateField(help_text="Date of the last close the forecast was made from")
+    today_price = models.FloatField()
+    base_prediction = models.FloatField()
+    tomorrow_prediction = models.FloatField()
+    adjustment_rule = models.CharField(max_length=40)
+    sentiment_score = models.FloatField()
+    overall_sentiment = models.CharField(max_length=10)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['ticker', 'as_of'])]
+
+    def __str__(self):
+        return f'{self.ticker} {self.as_of}: {self.tomorrow_prediction:.2f}'
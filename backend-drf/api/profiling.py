@@ -0,0 +1,133 @@
+"""
+Pipeline Profiling
+
+Per-stage instrumentation for the prediction pipeline. Stages are marked
+sequentially (each call to stage() closes the previous one), which keeps the
+view readable. Two independent measurements can be switched on per request:
+1. Memory - peak/retained allocation per stage (tracemalloc)
+2. CPU    - wall time and a cProfile of each stage; the merged profile can be
+            saved as a .prof file for snakeviz / pstats
+When both are off, marking a stage is a no-op.
+"""
+
+import cProfile
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+import uuid
+from pathlib import Path
+
+# cProfile hooks are interpreter-wide on recent Pythons, so one profiled
+# request at a time per process; others run unprofiled.
+_cpu_profile_lock = threading.Lock()
+
+KEEP_PROFILES = 50  # newest .prof files kept by StageProfiler.save()
+
+
+class StageProfiler:
+    """
+    Records the peak Python/NumPy allocation of each pipeline stage with
+    tracemalloc and/or a cProfile of each stage.
+    tracemalloc is process-wide, so concurrent requests in the same process
+    inflate each other's numbers; use it on a quiet worker.
+    """
+
+    def __init__(self, trace_memory=False, profile_cpu=False):
+        self.trace_memory = trace_memory
+        self.cpu_requested = profile_cpu
+        self.profile_cpu = profile_cpu and _cpu_profile_lock.acquire(blocking=False)
+        self._holds_cpu_lock = self.profile_cpu
+        self.stages = {}
+        self.timings = {}
+        self.cpu_profiles = {}
+        self._current = None
+        self._started_tracing = False
+        self._baseline = 0
+        self._started_at = 0.0
+        self._cpu = None
+
+        if trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+
+    def stage(self, name):
+        """Close the running stage (if any) and start measuring `name`."""
+        if not (self.trace_memory or self.profile_cpu):
+            return
+        self._close_stage()
+        self._current = name
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+            self._baseline = tracemalloc.get_traced_memory()[0]
+        if self.profile_cpu:
+            self._cpu = cProfile.Profile()
+            self._started_at = time.perf_counter()
+            self._cpu.enable()
+
+    def _close_stage(self):
+        if self._current is None:
+            return
+        if self.profile_cpu:
+            self._cpu.disable()
+            self.timings[self._current] = round((time.perf_counter() - self._started_at) * 1000, 1)
+            self.cpu_profiles[self._current] = self._cpu
+            self._cpu = None
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            self.stages[self._current] = {
+                'peak_kb': round((peak - self._baseline) / 1024, 1),
+                'retained_kb': round((current - self._baseline) / 1024, 1),
+            }
+        self._current = None
+
+    def finish(self):
+        """Stop profiling and return {stage: {peak_kb, retained_kb}} (None without memory tracing)."""
+        self._close_stage()
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        if self._holds_cpu_lock:
+            _cpu_profile_lock.release()
+            self._holds_cpu_lock = False
+        if not self.trace_memory:
+            return None
+        return self.stages
+
+    def cpu_report(self, top=15):
+        """
+        {stage: {wall_ms, top}} where `top` lists the functions with the most
+        own time in that stage. Call after finish().
+        """
+        report = {}
+        for name, profile in self.cpu_profiles.items():
+            stats = pstats.Stats(profile)
+            rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:top]
+            report[name] = {
+                'wall_ms': self.timings[name],
+                'top': [{
+                    'function': pstats.func_std_string(pstats.func_strip_path(func)),
+                    'calls': calls,
+                    'own_ms': round(own * 1000, 2),
+                    'cumulative_ms': round(cumulative * 1000, 2),
+                } for func, (_, calls, own, cumulative, _) in rows],
+            }
+        return report
+
+    def save(self, directory, prefix):
+        """Dump all stages merged into one .prof file under `directory`; returns the file name."""
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        if not self.cpu_profiles:
+            return None
+
+        prefix = re.sub(r'[^A-Za-z0-9._-]', '_', prefix)
+        name = f'{prefix}-{time.strftime("%Y%m%d-%H%M%S")}-{uuid.uuid4().hex[:8]}.prof'
+        pstats.Stats(*self.cpu_profiles.values()).dump_stats(directory / name)
+
+        old = sorted(directory.glob('*.prof'), key=os.path.getmtime, reverse=True)[KEEP_PROFILES:]
+        for path in old:
+            path.unlink(missing_ok=True)
+        return name
@@ -5,12 +5,36 @@ This module provides sentiment analysis from multiple sources:
 1. RSI (Relative Strength Index) - Technical indicator
 2. Volume Analysis - Trading activity
 3. News Sentiment - Using VADER sentiment analysis on stock news
+4. Fear & Greed Index - Alternative.me
+
+News and Fear & Greed are fetched concurrently. The last good value of each
+is cached so a request short on time (api/deadline.py) can be served a stale
+copy instead of waiting on a slow upstream. Requests on a deadline fetch with
+the remaining budget as the timeout and no retries, and at most one refresh
+per source is in flight, however many requests are waiting on it.
 """
 
+import threading
+
 import numpy as np
-import requests
+from concurrent.futures import ThreadPoolExecutor, wait
 from datetime import datetime, timedelta
 
+from django.core.cache import cache
+
+from .market_data import get_client
+
+STALE_SECONDS = 6 * 60 * 60  # how long a last good news / Fear & Greed value may be served
+FEAR_GREED_CACHE_KEY = 'sentiment:fear_greed'
+
+_external_pool = ThreadPoolExecutor(max_workers=4, thread_name_prefix='sentiment')
+_refreshing = {}  # cache key -> Future of the refresh in flight
+_refreshing_lock = threading.Lock()
+
+
+def news_cache_key(ticker):
+    return f'sentiment:news:{ticker}'
+
 
 def calculate_rsi(prices, period=14):
     """
@@ -19,7 +43,8 @@ def calculate_rsi(prices, period=14):
     RSI < 30 = Oversold (bullish signal)
     RSI 30-70 = Neutral
     """
-    prices = np.array(prices)
+    # Only the last `period` deltas are used (same window as rsi_series)
+    prices = np.asarray(prices[-(period + 1):], dtype=np.float64)
     deltas = np.diff(prices)
     
     gains = np.where(deltas > 0, deltas, 0)
@@ -34,7 +59,44 @@ def calculate_rsi(prices, period=14):
     rs = avg_gain / avg_loss
     rsi = 100 - (100 / (1 + rs))
     
-    return round(rsi, 2)
+    return round(float(rsi), 2)
+
+
+def rsi_series(prices, period=14):
+    """
+    Trailing RSI for every day of a price history (vectorized).
+    Entry t uses the `period` price changes ending at day t; the first
+    `period` entries are NaN.
+    """
+    prices = np.asarray(prices, dtype=np.float64)
+    rsi = np.full(len(prices), np.nan)
+    if len(prices) <= period:
+        return rsi
+
+    deltas = np.diff(prices)
+    gains = np.concatenate(([0.0], np.cumsum(np.where(deltas > 0, deltas, 0))))
+    losses = np.concatenate(([0.0], np.cumsum(np.where(deltas < 0, -deltas, 0))))
+    avg_gain = (gains[period:] - gains[:-period]) / period
+    avg_loss = (losses[period:] - losses[:-period]) / period
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rsi[period:] = np.where(avg_loss == 0, 100.0, 100 - (100 / (1 + avg_gain / avg_loss)))
+    return rsi
+
+
+def classify_sentiment(bullish_signals, bearish_signals):
+    """
+    Combine bullish/bearish signal weights into (sentiment_score, overall_sentiment).
+    Works on scalars or arrays; days without any signal are neutral with score 0.
+    """
+    bullish = np.asarray(bullish_signals, dtype=np.float64)
+    bearish = np.asarray(bearish_signals, dtype=np.float64)
+    total = bullish + bearish
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        score = np.where(total > 0, (bullish - bearish) / total, 0.0)
+    overall = np.where(score > 0.3, 'bullish', np.where(score < -0.3, 'bearish', 'neutral'))
+    return np.round(score, 2), overall
 
 
 def analyze_volume(volume_data):
@@ -45,23 +107,21 @@ def analyze_volume(volume_data):
     if len(volume_data) < 20:
         return None, "Insufficient volume data"
     
-    recent_volume = np.mean(volume_data[-5:])  # Last 5 days
-    avg_volume = np.mean(volume_data[-20:])    # Last 20 days average
+    recent_volume = float(np.mean(volume_data[-5:], dtype=np.float64))  # Last 5 days
+    avg_volume = float(np.mean(volume_data[-20:], dtype=np.float64))    # Last 20 days average
     
     volume_ratio = recent_volume / avg_volume if avg_volume > 0 else 1
     
     return round(volume_ratio, 2), recent_volume, avg_volume
 
 
-def get_news_sentiment(ticker):
+def get_news_sentiment(ticker, timeout=None, retries=None):
     """
     Get news sentiment using yfinance news data.
     Returns sentiment score and headlines.
     """
     try:
-        import yfinance as yf
-        stock = yf.Ticker(ticker)
-        news = stock.news
+        news = get_client().news(ticker, timeout=timeout, retries=retries)
         
         if not news:
             return None, []
@@ -98,29 +158,109 @@ def get_news_sentiment(ticker):
         return None, []
 
 
-def get_fear_greed_index():
+def get_fear_greed_index(timeout=5, retries=None):
     """
     Get the Fear & Greed Index from Alternative.me API (crypto-based but indicative of market sentiment).
     This is a free API that provides general market sentiment.
     """
     try:
-        response = requests.get('https://api.alternative.me/fng/?limit=1', timeout=5)
-        if response.status_code == 200:
-            data = response.json()
-            if 'data' in data and len(data['data']) > 0:
-                return {
-                    'value': int(data['data'][0]['value']),
-                    'classification': data['data'][0]['value_classification'],
-                    'timestamp': data['data'][0]['timestamp']
-                }
+        data = get_client().fear_greed(limit=1, timeout=timeout, retries=retries)
+        if 'data' in data and len(data['data']) > 0:
+            return {
+                'value': int(data['data'][0]['value']),
+                'classification': data['data'][0]['value_classification'],
+                'timestamp': data['data'][0]['timestamp']
+            }
     except Exception:
         pass
     return None
 
 
-def get_sentiment_summary(ticker, close_prices, volume_data=None):
+def _fresh_news_sentiment(ticker, **fetch):
+    news_score, headlines = get_news_sentiment(ticker, **fetch)
+    if news_score is not None:
+        cache.set(news_cache_key(ticker), (news_score, headlines), STALE_SECONDS)
+    return news_score, headlines
+
+
+def _fresh_fear_greed_index(**fetch):
+    fear_greed = get_fear_greed_index(**fetch)
+    if fear_greed is not None:
+        cache.set(FEAR_GREED_CACHE_KEY, fear_greed, STALE_SECONDS)
+    return fear_greed
+
+
+def _refresh(key, fn, *args, **kwargs):
+    """Start fn on the pool unless a refresh of `key` is already in flight; returns its Future."""
+    with _refreshing_lock:
+        future = _refreshing.get(key)
+        if future is not None:
+            return future
+        future = _external_pool.submit(fn, *args, **kwargs)
+        _refreshing[key] = future
+    # Outside the lock: the callback runs right here if the future has already finished
+    future.add_done_callback(lambda done: _forget_refresh(key, done))
+    return future
+
+
+def _forget_refresh(key, future):
+    with _refreshing_lock:
+        if _refreshing.get(key) is future:
+            del _refreshing[key]
+
+
+def get_external_sentiment(ticker, deadline=None):
+    """
+    ((news_score, headlines), fear_greed) with both sources fetched concurrently.
+    A source that fails, does not answer within the external sentiment budget
+    or is not started because the budget is gone falls back to its last good
+    value; with a deadline this is recorded in deadline.degraded.
+    """
+    sources = {
+        'news_sentiment': (news_cache_key(ticker), (None, []), _fresh_news_sentiment, (ticker,)),
+        'fear_greed': (FEAR_GREED_CACHE_KEY, None, _fresh_fear_greed_index, ()),
+    }
+    # Both fetchers swallow upstream errors; these results mean "no value"
+    is_miss = {
+        'news_sentiment': lambda result: result[0] is None,
+        'fear_greed': lambda result: result is None,
+    }
+
+    futures = {}
+    if deadline is None:
+        futures = {part: _refresh(key, fn, *args) for part, (key, _, fn, args) in sources.items()}
+        wait(futures.values())
+    elif deadline.allows('external_sentiment'):
+        # The fetch itself must fit the budget: no retries, the budget as the HTTP timeout
+        fetch = {'timeout': deadline.budget_for('external_sentiment'), 'retries': 0}
+        futures = {part: _refresh(key, fn, *args, **fetch) for part, (key, _, fn, args) in sources.items()}
+        with deadline.timed('external_sentiment'):
+            wait(futures.values(), timeout=fetch['timeout'])
+        for future in futures.values():
+            future.cancel()  # only succeeds for refreshes still queued behind other requests
+
+    results = {}
+    for part, (key, missing, _, _) in sources.items():
+        future = futures.get(part)
+        fresh = missing
+        if future is not None and future.done() and not future.cancelled():
+            fresh = future.result()
+            if not is_miss[part](fresh):
+                results[part] = fresh
+                continue
+
+        # Failed, still running (it refreshes the cache when it finishes), cancelled or never started
+        stale = cache.get(key)
+        if deadline is not None:
+            deadline.degrade(part, 'stale' if stale is not None else 'unavailable')
+        results[part] = stale if stale is not None else fresh
+    return results['news_sentiment'], results['fear_greed']
+
+
+def get_sentiment_summary(ticker, close_prices, volume_data=None, deadline=None):
     """
     Generate a comprehensive sentiment analysis summary.
+    External sources are bounded by `deadline` (api/deadline.py) when given.
     """
     sentiment_data = {
         'rsi': None,
@@ -173,8 +313,8 @@ def get_sentiment_summary(ticker, close_prices, volume_data=None):
             else:
                 bearish_signals += 1
     
-    # 3. News Sentiment
-    news_score, headlines = get_news_sentiment(ticker)
+    # 3. News Sentiment (fetched together with the Fear & Greed Index)
+    (news_score, headlines), fear_greed = get_external_sentiment(ticker, deadline)
     if news_score is not None:
         sentiment_data['news_sentiment'] = news_score
         sentiment_data['news_headlines'] = headlines[:5]  # Top 5 headlines
@@ -185,7 +325,6 @@ def get_sentiment_summary(ticker, close_prices, volume_data=None):
             bearish_signals += 1
     
     # 4. Fear & Greed Index
-    fear_greed = get_fear_greed_index()
     if fear_greed:
         sentiment_data['fear_greed'] = fear_greed
         if fear_greed['value'] > 60:
@@ -194,16 +333,9 @@ def get_sentiment_summary(ticker, close_prices, volume_data=None):
             bearish_signals += 0.5  # Fear
     
     # Calculate overall sentiment
-    total_signals = bullish_signals + bearish_signals
-    if total_signals > 0:
-        sentiment_score = (bullish_signals - bearish_signals) / total_signals
-        sentiment_data['sentiment_score'] = round(sentiment_score, 2)
-        
-        if sentiment_score > 0.3:
-            sentiment_data['overall_sentiment'] = 'bullish'
-        elif sentiment_score < -0.3:
-            sentiment_data['overall_sentiment'] = 'bearish'
-        else:
-            sentiment_data['overall_sentiment'] = 'neutral'
+    if bullish_signals + bearish_signals > 0:
+        score, overall = classify_sentiment(bullish_signals, bearish_signals)
+        sentiment_data['sentiment_score'] = float(score)
+        sentiment_data['overall_sentiment'] = str(overall)
     
     return sentiment_data
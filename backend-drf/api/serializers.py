@@ -1,9 +1,51 @@
+import re
+from datetime import date
+
 from rest_framework import serializers
 
+from .export import FORMATS
+
+MAX_EXPORT_TICKERS = 500
+# Upper-case symbols as Yahoo spells them, e.g. BRK.B, ^GSPC, EURUSD=X
+TICKER_PATTERN = re.compile(r'^[A-Z0-9.\-^=]{1,20}$')
+
+
+def invalid_tickers(tickers):
+    return [t for t in tickers if not TICKER_PATTERN.match(t)]
+
+
 class StockPredictionSerializer(serializers.Serializer):
     ticker = serializers.CharField(max_length=20)
+    # Latency budget in ms; optional stages are skipped to meet it (api/deadline.py)
+    deadline_ms = serializers.IntegerField(required=False, min_value=1)
 
+    def validate_ticker(self, value):
+        ticker = value.strip().upper()
+        if invalid_tickers([ticker]):
+            raise serializers.ValidationError("Not a valid ticker symbol.")
+        return ticker
 
 
+class ExportSerializer(serializers.Serializer):
+    """Query parameters of /export/. `fmt` rather than `format`, which DRF reserves for renderers."""
+    tickers = serializers.CharField()
+    start = serializers.DateField()
+    end = serializers.DateField(required=False)
+    fmt = serializers.ChoiceField(choices=list(FORMATS), default='parquet')
 
+    def validate_tickers(self, value):
+        tickers = list(dict.fromkeys(t.strip().upper() for t in value.split(',') if t.strip()))
+        if not tickers:
+            raise serializers.ValidationError("Provide at least one ticker.")
+        if len(tickers) > MAX_EXPORT_TICKERS:
+            raise serializers.ValidationError(f"At most {MAX_EXPORT_TICKERS} tickers per export.")
+        invalid = invalid_tickers(tickers)
+        if invalid:
+            raise serializers.ValidationError(f"Not valid ticker symbols: {', '.join(invalid[:10])}")
+        return tickers
 
+    def validate(self, data):
+        data.setdefault('end', date.today())
+        if data['start'] > data['end']:
+            raise serializers.ValidationError("start must not be after end.")
+        return data
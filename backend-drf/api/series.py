@@ -0,0 +1,52 @@
+"""
+Float32 Price Series Helpers
+
+Small NumPy replacements for the pandas/scikit-learn pieces of the prediction
+pipeline. Everything works on contiguous float32 arrays and returns views
+where possible, so a request never materialises DataFrame copies.
+"""
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+WINDOW = 100  # LSTM input length in days
+
+
+def moving_average(values, window):
+    """
+    Trailing simple moving average, same as pandas rolling(window).mean().
+    The first window-1 entries are NaN. Summed in float64 to avoid drift.
+    """
+    out = np.full(len(values), np.nan, dtype=np.float32)
+    if len(values) >= window:
+        csum = np.cumsum(values, dtype=np.float64)
+        sums = csum[window - 1:].copy()
+        sums[1:] -= csum[:-window]
+        out[window - 1:] = sums / window
+    return out
+
+
+def minmax_fit(values):
+    """
+    Return (minimum, range) for scaling to [0, 1], like MinMaxScaler.fit.
+    A flat series gets a range of 1 so scaling is a no-op shift.
+    """
+    lo = np.float32(values.min())
+    rng = np.float32(values.max()) - lo
+    return lo, (rng if rng > 0 else np.float32(1.0))
+
+
+def minmax_transform(values, lo, rng):
+    return (values - lo) / rng
+
+
+def minmax_inverse(scaled, lo, rng):
+    return scaled * rng + lo
+
+
+def windows(values, window=WINDOW):
+    """
+    Read-only (n, window, 1) view of every consecutive window of `values`
+    that has a following value to predict - no data is copied.
+    """
+    return sliding_window_view(values[:-1], window)[..., np.newaxis]
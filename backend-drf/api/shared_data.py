@@ -0,0 +1,194 @@
+"""
+Cross-Worker Shared Price Data
+
+Price histories and their indicator series are published once per host into
+memory-mapped .npy files (under /dev/shm by default, i.e. shared memory) and
+attached read-only by every worker process. With N workers this keeps one
+copy of each history instead of N, and a history fetched by one worker is a
+cache hit for all of them.
+
+Each ticker is a single float32 array of shape (5, n), one contiguous row per
+series: dates (days since epoch), close, volume, ma100, ma200. Publishing
+writes a new file and renames it over the old one, so readers never see a
+partial update; workers notice the new file (a new bar was appended) on their
+next read and re-attach.
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+from .market_data import EMPTY_HISTORY, PriceHistory, get_client
+from .series import moving_average
+
+try:
+    import fcntl
+except ImportError:  # non-POSIX: concurrent fetches are not de-duplicated
+    fcntl = None
+
+ROWS = ('dates', 'close', 'volume', 'ma100', 'ma200')
+_UNSAFE_KEY_CHARS = re.compile(r'[^A-Za-z0-9.^=_-]')
+
+
+def default_directory():
+    base = '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir()
+    return os.path.join(base, 'stock-prediction')
+
+
+class SharedHistory(NamedTuple):
+    history: PriceHistory
+    ma100: np.ndarray
+    ma200: np.ndarray
+
+
+def history_key(ticker, period, source=''):
+    """
+    Store key for one history. `source` is the upstream it came from (the
+    market-data base URL), so stand-in and real data never share a file.
+    """
+    digest = hashlib.sha1(source.encode()).hexdigest()[:8]
+    return f'{ticker}_{period}_{digest}'
+
+
+def with_indicators(history):
+    return SharedHistory(history, moving_average(history.close, 100), moving_average(history.close, 200))
+
+
+class SharedHistoryStore:
+    """Publishes and attaches memory-mapped per-ticker histories in a shared directory."""
+
+    def __init__(self, directory, max_age_seconds):
+        self.directory = Path(directory)
+        self.max_age_seconds = max_age_seconds
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._attached = {}  # key -> (inode, mtime_ns, memmap)
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _file_stem(key):
+        # Keys end up in file names; never let one name another directory
+        return _UNSAFE_KEY_CHARS.sub('_', key)
+
+    def _path(self, key):
+        return self.directory / f'{self._file_stem(key)}.npy'
+
+    def publish(self, key, history):
+        """Write history plus indicators for `key` and atomically replace the previous version."""
+        shared = with_indicators(history)
+        data = np.empty((len(ROWS), len(history)), dtype=np.float32)
+        data[0] = history.dates.astype(np.int64)
+        data[1] = history.close
+        data[2] = history.volume
+        data[3] = shared.ma100
+        data[4] = shared.ma200
+
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=f'.{self._file_stem(key)}.', suffix='.npy')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.save(f, data)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        return shared
+
+    def load(self, key):
+        """Attach the published arrays for `key`; None if missing or older than max_age_seconds."""
+        try:
+            stat = self._path(key).stat()
+        except FileNotFoundError:
+            return None
+        if time.time() - stat.st_mtime > self.max_age_seconds:
+            return None
+
+        with self._lock:
+            cached = self._attached.get(key)
+            if cached is None or cached[:2] != (stat.st_ino, stat.st_mtime_ns):
+                # Read-only mapping: pages are shared with every other process attached to the file
+                data = np.load(self._path(key), mmap_mode='r')
+                cached = (stat.st_ino, stat.st_mtime_ns, data)
+                self._attached[key] = cached
+        data = cached[2]
+
+        history = PriceHistory(data[0].astype('datetime64[D]'), data[1], data[2])
+        return SharedHistory(history, data[3], data[4])
+
+    @contextmanager
+    def fetch_lock(self, key):
+        """Host-wide lock so only one worker fetches a given ticker from upstream at a time."""
+        if fcntl is None:
+            yield
+            return
+        with open(self.directory / f'.{self._file_stem(key)}.lock', 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Process-wide store from settings.SHARED_DATA, or None when disabled."""
+    global _store
+    options = getattr(settings, 'SHARED_DATA', {})
+    if not options.get('ENABLED', True):
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SharedHistoryStore(
+                    options.get('DIR') or default_directory(),
+                    options.get('MAX_AGE_SECONDS', 900),
+                )
+    return _store
+
+
+@receiver(setting_changed)
+def reset_store(setting=None, **kwargs):
+    """Drop the shared store so the next get_store() picks up changed settings."""
+    global _store
+    if setting in (None, 'SHARED_DATA'):
+        with _store_lock:
+            _store = None
+
+
+def get_shared_history(ticker, period='10y'):
+    """
+    History and moving averages for `ticker`, read from the shared store when a
+    fresh copy is published, otherwise fetched upstream and published for the
+    other workers.
+    """
+    store = get_store()
+    if store is None:
+        history = get_client().history(ticker, period=period)
+        return with_indicators(history)
+
+    key = history_key(ticker, period, get_client().base_url)
+    shared = store.load(key)
+    if shared is not None:
+        return shared
+
+    with store.fetch_lock(key):
+        # Another worker may have published while we waited for the lock
+        shared = store.load(key)
+        if shared is not None:
+            return shared
+        history = get_client().history(ticker, period=period)
+        if len(history) == 0:
+            return SharedHistory(EMPTY_HISTORY, EMPTY_HISTORY.close, EMPTY_HISTORY.close)
+        return store.publish(key, history)
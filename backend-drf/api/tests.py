@@ -1,3 +1,779 @@
-from django.test import TestCase
+import io
+import json
+import os
+import runpy
+import tempfile
+import threading
+import time
+import tracemalloc
+from concurrent.futures import Future
+from pathlib import Path
+from types import SimpleNamespace
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+import pandas as pd
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from rest_framework.exceptions import Throttled
+from rest_framework.test import APIClient
+from sklearn.preprocessing import MinMaxScaler
+
+from .adjustment import RULES, adjust_predictions
+from .admission import AdmissionController, ServerOverloaded
+from .backtest import prepare_windows, run_backtest
+from .deadline import Deadline, StageCosts
+from . import inference
+from .export import ticker_columns
+from .management.commands.loadtest import delete_accounts
+from .models import Prediction
+from .profiling import StageProfiler
+from .market_data import MarketDataClient, MarketDataError, PriceHistory, RateLimiter
+from . import sentiment
+from .sentiment import calculate_rsi, get_external_sentiment, rsi_series
+from .serializers import ExportSerializer, StockPredictionSerializer
+from .series import minmax_fit, minmax_inverse, minmax_transform, moving_average, windows
+from .shared_data import SharedHistoryStore, history_key
+from .upstream_stubs import start_stub_server
+
+
+class RateLimiterTests(SimpleTestCase):
+    def test_burst_is_served_without_waiting(self):
+        limiter = RateLimiter(rate=10, burst=3)
+        self.assertEqual([limiter.acquire() for _ in range(3)], [0.0, 0.0, 0.0])
+
+    def test_waits_for_refill_once_burst_is_spent(self):
+        limiter = RateLimiter(rate=20, burst=1)
+        limiter.acquire()
+        started = time.monotonic()
+        wait = limiter.acquire()
+        self.assertAlmostEqual(wait, 0.05, delta=0.02)
+        self.assertGreaterEqual(time.monotonic() - started, 0.04)
+
+    def test_concurrent_callers_are_spaced_by_reservation(self):
+        limiter = RateLimiter(rate=50, burst=1)
+        waits = []
+        lock = threading.Lock()
+
+        def call():
+            wait = limiter.acquire()
+            with lock:
+                waits.append(wait)
+
+        threads = [threading.Thread(target=call) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # One free token, then each caller reserves the next slot (20 ms apart)
+        self.assertEqual(sorted(round(w / 0.02) for w in waits), [0, 1, 2, 3, 4])
+
+    def test_background_callers_take_tokens_as_they_refill(self):
+        limiter = RateLimiter(rate=100, burst=2)
+        started = time.monotonic()
+        limiter.acquire(tokens=10, background=True)
+        self.assertAlmostEqual(time.monotonic() - started, 0.08, delta=0.04)
+
+    def test_foreground_is_not_queued_behind_background_bulk(self):
+        limiter = RateLimiter(rate=50, burst=1)
+        bulk = threading.Thread(target=limiter.acquire, kwargs={'tokens': 50, 'background': True})
+        bulk.start()
+        time.sleep(0.1)
+        # A reserving bulk call would put this ~0.9 s out; a background one yields after one token
+        self.assertLess(limiter.acquire(), 0.05)
+        bulk.join()
+
+    def test_zero_rate_disables_limiting(self):
+        limiter = RateLimiter(rate=0, burst=0)
+        self.assertEqual(limiter.acquire(tokens=100), 0.0)
+
+
+class MarketDataClientTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = start_stub_server()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def market_client(self, **kwargs):
+        options = {
+            'base_url': self.server.url,
+            'fear_greed_url': f'{self.server.url}/fng/',
+            'rate_limit_per_sec': 0,
+            'max_retries': 2,
+            'backoff_factor': 0,
+        }
+        return MarketDataClient(**{**options, **kwargs})
+
+    def test_history_is_float32_oldest_first(self):
+        history = self.market_client().history('TSLA', period='1y')
+        self.assertEqual(len(history), 252)
+        self.assertEqual(history.close.dtype, np.float32)
+        self.assertEqual(history.volume.dtype, np.float32)
+        self.assertTrue(np.all(np.diff(history.dates.astype(np.int64)) > 0))
+
+    def test_history_volume_can_be_exact(self):
+        volume = self.market_client().history('TSLA', period='1y').volume
+        exact = self.market_client().history_many(['TSLA'], period='1y', volume_dtype=np.float64)['TSLA'].volume
+        self.assertEqual(exact.dtype, np.float64)
+        self.assertTrue(np.all(exact == np.round(exact)))
+        np.testing.assert_allclose(volume, exact, rtol=1e-7)
+
+    def test_history_many_returns_every_ticker(self):
+        histories = self.market_client().history_many(['TSLA', 'AAPL', 'TSLA'], period='1y')
+        self.assertEqual(list(histories), ['TSLA', 'AAPL'])
+        self.assertFalse(np.array_equal(histories['TSLA'].close, histories['AAPL'].close))
+
+    def test_news_and_fear_greed(self):
+        client = self.market_client()
+        self.assertTrue(all(article['title'] for article in client.news('TSLA')))
+        self.assertEqual(client.fear_greed()['data'][0]['value_classification'], 'Greed')
+
+    def test_transient_errors_are_retried(self):
+        attempts = []
+
+        def flaky():
+            attempts.append(1)
+            if len(attempts) < 3:
+                raise requests.ConnectionError('reset')
+            return 'ok'
+
+        self.assertEqual(self.market_client()._call(flaky), 'ok')
+        self.assertEqual(len(attempts), 3)
+
+    def test_permanent_errors_are_not_retried(self):
+        attempts = []
+
+        def broken():
+            attempts.append(1)
+            raise ValueError('bad payload')
+
+        with self.assertRaises(MarketDataError):
+            self.market_client()._call(broken)
+        self.assertEqual(len(attempts), 1)
+
+    def test_retries_give_up_with_market_data_error(self):
+        client = self.market_client(base_url='http://127.0.0.1:9', max_retries=1, timeout=0.5)
+        with self.assertRaises(MarketDataError):
+            client.history('TSLA')
+
+
+class SeriesTests(SimpleTestCase):
+    """The NumPy helpers against the pandas / scikit-learn code they replaced."""
+
+    def prices(self, n, seed=3):
+        return (100 + np.cumsum(np.random.default_rng(seed).normal(0, 2, n))).astype(np.float32)
+
+    def test_moving_average_matches_pandas_rolling(self):
+        for n in (150, 199, 200, 201, 2500):
+            close = self.prices(n)
+            for window in (100, 200):
+                expected = pd.Series(close).rolling(window).mean().to_numpy()
+                np.testing.assert_allclose(moving_average(close, window), expected, rtol=1e-5, equal_nan=True)
+
+    def test_moving_average_of_a_short_history_is_all_nan(self):
+        self.assertTrue(np.isnan(moving_average(self.prices(150), 200)).all())
+        self.assertEqual(len(moving_average(np.empty(0, dtype=np.float32), 100)), 0)
+
+    def test_minmax_matches_scaler(self):
+        for close in (self.prices(600), np.full(300, 42.5, dtype=np.float32)):
+            scaler = MinMaxScaler(feature_range=(0, 1)).fit(close.reshape(-1, 1))
+            lo, rng = minmax_fit(close)
+            scaled = minmax_transform(close, lo, rng)
+            np.testing.assert_allclose(scaled, scaler.transform(close.reshape(-1, 1)).ravel(), atol=1e-6)
+            np.testing.assert_allclose(minmax_inverse(scaled, lo, rng), close, rtol=1e-6)
+
+    def test_windows_match_the_evaluation_loop(self):
+        scaled = self.prices(260)
+        x_eval = np.array([scaled[i - 100:i] for i in range(100, len(scaled))]).reshape(-1, 100, 1)
+        view = windows(scaled)
+        self.assertEqual(view.shape, x_eval.shape)
+        np.testing.assert_array_equal(view, x_eval)
+        self.assertFalse(view.flags.writeable)
+
+
+class StageProfilerTests(SimpleTestCase):
+    def test_memory_is_reported_per_stage(self):
+        self.assertFalse(tracemalloc.is_tracing())
+        profiler = StageProfiler(trace_memory=True)
+        profiler.stage('fetch')
+        data = np.ones(256 * 1024)
+        profiler.stage('forecast')
+        del data
+        stages = profiler.finish()
+
+        self.assertEqual(list(stages), ['fetch', 'forecast'])
+        self.assertEqual(set(stages['fetch']), {'peak_kb', 'retained_kb'})
+        self.assertGreaterEqual(stages['fetch']['peak_kb'], 2048)
+        self.assertFalse(tracemalloc.is_tracing())
+
+    def test_disabled_profiler_records_nothing(self):
+        profiler = StageProfiler()
+        profiler.stage('fetch')
+        self.assertIsNone(profiler.finish())
+        self.assertEqual(profiler.stages, {})
+
+
+class AdmissionControllerTests(SimpleTestCase):
+    def controller(self, **kwargs):
+        options = {'max_concurrent': 1, 'max_per_user': 1, 'max_queue': 1, 'max_wait_seconds': 5.0}
+        return AdmissionController(**{**options, **kwargs})
+
+    def test_release_frees_the_slot_and_the_key(self):
+        admission = self.controller()
+        admission.release(admission.acquire('user:1'))
+        self.assertEqual(admission.in_flight, 0)
+        self.assertEqual(admission._per_key, {})
+
+    def test_per_user_limit_is_throttled_without_leaking_keys(self):
+        admission = self.controller(max_concurrent=2)
+        ticket = admission.acquire('user:1')
+        with self.assertRaises(Throttled):
+            admission.acquire('user:1')
+        with self.assertRaises(Throttled):
+            admission.acquire('user:1')
+        self.assertEqual(admission._per_key, {'user:1': 1})
+        admission.release(ticket)
+        self.assertEqual(admission._per_key, {})
+        self.assertEqual(admission.rejected, 2)
+
+    def test_full_queue_is_rejected_with_503(self):
+        admission = self.controller(max_queue=0)
+        ticket = admission.acquire('user:1')
+        with self.assertRaises(ServerOverloaded) as raised:
+            admission.acquire('user:2')
+        self.assertEqual(raised.exception.status_code, 503)
+        self.assertGreaterEqual(raised.exception.wait, 1)
+        self.assertEqual(admission._per_key, {'user:1': 1})
+        admission.release(ticket)
+
+    def test_expected_wait_over_limit_is_rejected(self):
+        admission = self.controller(max_queue=5, max_wait_seconds=1.0, initial_service_seconds=3.0)
+        ticket = admission.acquire('user:1')
+        with self.assertRaises(ServerOverloaded):
+            admission.acquire('user:2')
+        admission.release(ticket)
+
+    def test_queued_request_gets_the_released_slot(self):
+        admission = self.controller()
+        ticket = admission.acquire('user:1')
+        tickets = []
+        waiter = threading.Thread(target=lambda: tickets.append(admission.acquire('user:2')))
+        waiter.start()
+        while admission.queued == 0:
+            time.sleep(0.001)
+        admission.release(ticket)
+        waiter.join(timeout=5)
+        self.assertEqual(admission.in_flight, 1)
+        self.assertEqual(admission._per_key, {'user:2': 1})
+        admission.release(tickets[0])
+        self.assertEqual(admission._per_key, {})
+
+    def test_queue_timeout_releases_the_key(self):
+        admission = self.controller(max_wait_seconds=0.05, initial_service_seconds=0.01)
+        ticket = admission.acquire('user:1')
+        with self.assertRaises(ServerOverloaded):
+            admission.acquire('user:2')
+        self.assertEqual(admission.queued, 0)
+        self.assertEqual(admission._per_key, {'user:1': 1})
+        admission.release(ticket)
+        self.assertEqual(admission._per_key, {})
+
+
+class GunicornThreadsTests(SimpleTestCase):
+    def gunicorn_config(self, **env):
+        with mock.patch.dict('os.environ', env):
+            return runpy.run_path(str(Path(settings.BASE_DIR) / 'gunicorn.conf.py'))
+
+    def test_default_threads_leave_room_for_cheap_endpoints(self):
+        config = self.gunicorn_config()
+        admission = settings.PREDICTION_ADMISSION
+        self.assertGreater(config['threads'], admission['MAX_CONCURRENT'] + admission['MAX_QUEUE'])
+        config['on_starting'](SimpleNamespace(cfg=SimpleNamespace(threads=config['threads'])))
+
+    def test_too_few_threads_fail_at_startup(self):
+        config = self.gunicorn_config(GUNICORN_THREADS='2')
+        with self.assertRaisesMessage(RuntimeError, 'leaves no thread for token/'):
+            config['on_starting'](SimpleNamespace(cfg=SimpleNamespace(threads=config['threads'])))
+
+
+def branch_adjustment(today_price, base_prediction, sentiment_score, overall_sentiment, rsi):
+    """The per-request if/elif rules that adjust_predictions replaced, kept as the reference."""
+    base_change_pct = ((base_prediction - today_price) / today_price) * 100
+    lstm_bullish = base_change_pct > 2
+    lstm_bearish = base_change_pct < -2
+    is_bearish = overall_sentiment == 'bearish' or sentiment_score < -0.1
+    is_bullish = overall_sentiment == 'bullish' or sentiment_score > 0.1
+
+    if lstm_bullish and is_bearish:
+        dampening = max(0.1, 0.5 + sentiment_score * 0.4)
+        if sentiment_score < -0.3:
+            adjusted_change = -abs(base_change_pct) * 0.1
+        else:
+            adjusted_change = base_change_pct * dampening
+        return today_price * (1 + adjusted_change / 100), 0
+    elif lstm_bearish and is_bullish:
+        dampening = max(0.1, 0.5 - sentiment_score * 0.4)
+        if sentiment_score > 0.3:
+            adjusted_change = abs(base_change_pct) * 0.1
+        else:
+            adjusted_change = base_change_pct * dampening
+        return today_price * (1 + adjusted_change / 100), 1
+    elif abs(base_change_pct) > 5:
+        return today_price * (1 + base_change_pct * 0.3 / 100), 2
+    else:
+        sentiment_adjustment = sentiment_score * 0.02
+        if rsi is not None:
+            if rsi > 70:
+                sentiment_adjustment -= 0.01 * ((rsi - 70) / 30)
+            elif rsi < 30:
+                sentiment_adjustment += 0.01 * ((30 - rsi) / 30)
+        return base_prediction * (1 + sentiment_adjustment), 3
+
+
+class AdjustmentTests(SimpleTestCase):
+    def test_matches_branch_rules(self):
+        rng = np.random.default_rng(0)
+        n = 5000
+        today = rng.uniform(5, 500, n)
+        base = today * (1 + rng.normal(0, 0.04, n))
+        score = np.round(rng.uniform(-1, 1, n), 2)
+        overall = rng.choice(['bullish', 'bearish', 'neutral'], n)
+        rsi = rng.uniform(0, 100, n)
+        rsi[rng.random(n) < 0.1] = np.nan
+
+        adjusted, rule = adjust_predictions(today, base, score, overall, rsi)
+
+        for i in range(n):
+            expected, expected_rule = branch_adjustment(
+                today[i], base[i], score[i], overall[i], None if np.isnan(rsi[i]) else rsi[i])
+            self.assertEqual(rule[i], expected_rule, RULES[expected_rule])
+            self.assertAlmostEqual(adjusted[i], expected, places=9)
+        self.assertEqual(set(rule.tolist()), {0, 1, 2, 3})
+
+    def test_scalar_inputs(self):
+        adjusted, rule = adjust_predictions(100.0, 110.0, -0.5, 'bearish', 50.0)
+        self.assertEqual(RULES[int(rule)], 'lstm_bullish_sentiment_bearish')
+        self.assertAlmostEqual(float(adjusted), 99.0)
+
+
+class RSITests(SimpleTestCase):
+    def test_calculate_rsi_uses_the_trailing_window(self):
+        prices = np.concatenate([np.linspace(100, 50, 40), np.linspace(50, 80, 15)])
+        self.assertEqual(calculate_rsi(prices), 100)
+        self.assertAlmostEqual(calculate_rsi(prices), round(rsi_series(prices)[-1], 2))
+
+        prices = np.random.default_rng(1).uniform(90, 110, 60)
+        self.assertAlmostEqual(calculate_rsi(prices), round(rsi_series(prices)[-1], 2))
+
+
+class IdentityModel:
+    """Predicts the last scaled value of each window, so forecasts equal today's close."""
+
+    def __init__(self):
+        self.batches = []
+
+    def predict(self, x, batch_size=None, verbose=0):
+        self.batches.append(len(x))
+        return x[:, -1, :]
+
+
+class BacktestTests(SimpleTestCase):
+    def histories(self):
+        rng = np.random.default_rng(2)
+        out = {}
+        for ticker, n in (('AAA', 180), ('BBB', 250), ('CCC', 90)):
+            close = (100 + np.cumsum(rng.normal(0, 1, n))).astype(np.float32)
+            volume = rng.uniform(1e6, 2e6, n).astype(np.float32)
+            dates = np.arange(n).astype('datetime64[D]')
+            out[ticker] = PriceHistory(dates, close, volume)
+        return out
+
+    def test_prepare_windows_scales_each_window(self):
+        close = self.histories()['AAA'].close
+        x, lo, rng, today_idx = prepare_windows(close)
+        self.assertEqual(x.shape, (len(close) - 100, 100))
+        self.assertEqual(today_idx[0], 99)
+        np.testing.assert_allclose(x[:, -1] * rng + lo, close[today_idx], rtol=1e-5)
+
+    def test_windows_are_batched_up_to_max_windows(self):
+        model = IdentityModel()
+        report = run_backtest(self.histories(), model, max_windows=50)
+        # CCC is too short; AAA (80 windows) fills a batch on its own, then BBB (150)
+        self.assertEqual(report['tickers'], 2)
+        self.assertEqual(model.batches, [80, 150])
+        self.assertEqual(report['days'], 230)
+        self.assertEqual(report['by_ticker']['AAA']['days'], 80)
+
+        single = IdentityModel()
+        self.assertEqual(run_backtest(self.histories(), single)['rules'], report['rules'])
+        self.assertEqual(single.batches, [230])
+
+
+class FakePredictor:
+    def __init__(self, path):
+        self.path = Path(path)
+
+
+def variant(name, mape, directional, latency_ms, fmt='fake'):
+    return {'name': name, 'format': fmt, 'path': f'{name}.bin', 'mape': mape,
+            'directional_accuracy': directional, 'latency_ms': latency_ms, 'memory_bytes': 1024}
+
+
+class ModelVariantTests(SimpleTestCase):
+    tolerance = {'MAPE_INCREASE': 0.1, 'DIRECTIONAL_DROP': 1.0}
+    variants = [
+        variant('float32', 2.00, 55.0, 10.0, fmt='keras'),
+        variant('float16', 2.05, 54.5, 6.0),
+        variant('int8', 2.50, 55.0, 2.0),       # faster, but MAPE is 0.5 pts worse
+        variant('int8_fast', 2.02, 53.0, 1.0),  # fastest, but 2 pts less directional accuracy
+    ]
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.dir = Path(tmp.name)
+        self.model_path = self.dir / 'model.keras'
+        self.model_path.write_bytes(b'weights')
+        self.manifest_path = self.dir / 'variants' / 'manifest.json'
+        self.manifest_path.parent.mkdir()
+        for patcher in (mock.patch.dict(inference.LOADERS, {'fake': FakePredictor}),
+                        mock.patch.object(inference, 'KerasPredictor', FakePredictor)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def write_manifest(self, variants, source_sha256=None):
+        self.manifest_path.write_text(json.dumps({
+            'source_sha256': source_sha256 or inference.file_sha256(self.model_path),
+            'variants': variants,
+        }))
+
+    def load(self):
+        with override_settings(PREDICTION_MODEL_PATH=str(self.model_path),
+                               MODEL_VARIANTS_MANIFEST=str(self.manifest_path),
+                               MODEL_ACCURACY_TOLERANCE=self.tolerance):
+            return inference._load_serving_predictor()
+
+    def test_fastest_variant_within_tolerance_is_selected(self):
+        chosen, baseline = inference.select_variant({'variants': self.variants}, self.tolerance)
+        self.assertEqual((chosen['name'], baseline['name']), ('float16', 'float32'))
+
+    def test_variants_outside_tolerance_are_never_selected(self):
+        strict = {'MAPE_INCREASE': 0.0, 'DIRECTIONAL_DROP': 0.0}
+        chosen, _ = inference.select_variant({'variants': self.variants}, strict)
+        self.assertEqual(chosen['name'], 'float32')
+
+    def test_selected_variant_is_served(self):
+        self.write_manifest(self.variants)
+        self.assertEqual(self.load().path, self.manifest_path.parent / 'float16.bin')
+
+    def test_manifest_of_another_model_falls_back_to_float32(self):
+        self.write_manifest(self.variants, source_sha256='0' * 64)
+        with self.assertLogs('api.inference', 'WARNING'):
+            self.assertEqual(self.load().path, self.model_path)
+
+    def test_missing_manifest_serves_float32(self):
+        self.assertEqual(self.load().path, self.model_path)
+
+
+class TickerValidationTests(SimpleTestCase):
+    def test_prediction_ticker_is_upper_cased(self):
+        for ticker, expected in (('tsla', 'TSLA'), ('brk.b', 'BRK.B'), ('^GSPC', '^GSPC'), ('EURUSD=X', 'EURUSD=X')):
+            serializer = StockPredictionSerializer(data={'ticker': ticker})
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+            self.assertEqual(serializer.validated_data['ticker'], expected)
+
+    def test_path_like_tickers_are_rejected(self):
+        for ticker in ('/../SHDX/Q', '../etc', 'A B', 'TSLA/'):
+            self.assertFalse(StockPredictionSerializer(data={'ticker': ticker}).is_valid(), ticker)
+        serializer = ExportSerializer(data={'tickers': 'TSLA,../x', 'start': '2024-01-01'})
+        self.assertFalse(serializer.is_valid())
+
+
+class SharedHistoryStoreTests(SimpleTestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.store = SharedHistoryStore(Path(self.tmp.name) / 'store', max_age_seconds=60)
+
+    def history(self, n=30):
+        close = np.linspace(10, 20, n, dtype=np.float32)
+        return PriceHistory(np.arange(n).astype('datetime64[D]'), close, np.full(n, 1e6, dtype=np.float32))
+
+    def test_publish_and_load(self):
+        key = history_key('TSLA', '10y')
+        self.store.publish(key, self.history())
+        np.testing.assert_array_equal(self.store.load(key).history.close, self.history().close)
+
+    def test_republished_history_is_reattached(self):
+        key = history_key('TSLA', '10y')
+        self.store.publish(key, self.history(30))
+        self.assertEqual(len(self.store.load(key).history), 30)
+
+        # Another worker appends a bar and publishes; this store must notice on its next read
+        other_worker = SharedHistoryStore(self.store.directory, max_age_seconds=60)
+        other_worker.publish(key, self.history(31))
+        shared = self.store.load(key)
+        self.assertEqual(len(shared.history), 31)
+        self.assertEqual(len(shared.ma100), 31)
+
+    def test_stale_entries_are_not_served(self):
+        key = history_key('TSLA', '10y')
+        self.store.publish(key, self.history())
+        path = self.store._path(key)
+        old = time.time() - 61
+        os.utime(path, (old, old))
+        self.assertIsNone(self.store.load(key))
+        self.assertIsNone(self.store.load(history_key('AAPL', '10y')))
+
+    def test_key_includes_the_data_source(self):
+        self.assertNotEqual(history_key('TSLA', '10y'), history_key('TSLA', '10y', 'http://127.0.0.1:8001'))
+        self.store.publish(history_key('TSLA', '10y', 'http://127.0.0.1:8001'), self.history())
+        self.assertIsNone(self.store.load(history_key('TSLA', '10y')))
+
+    def test_keys_cannot_leave_the_store_directory(self):
+        key = history_key('/../SHDX/Q', '10y')
+        with self.store.fetch_lock(key):
+            self.store.publish(key, self.history())
+        self.assertIsNotNone(self.store.load(key))
+        outside = [p for p in Path(self.tmp.name).iterdir() if p.name != 'store']
+        self.assertEqual(outside, [])
+        self.assertTrue(all(p.parent == self.store.directory for p in self.store.directory.rglob('*')))
+
+
+class ExportColumnsTests(SimpleTestCase):
+    def test_volume_is_exported_exactly(self):
+        n = 5
+        dates = np.arange(np.datetime64('2024-01-01'), np.datetime64('2024-01-01') + n)
+        volume = np.array([93831500, 16777217, 1, 0, 2 ** 40 + 3], dtype=np.float64)
+        history = PriceHistory(dates, np.ones(n, dtype=np.float32), volume)
+        columns = ticker_columns('TSLA', history, None, dates[0].item(), dates[-1].item())
+        self.assertEqual(columns['volume'].dtype, np.int64)
+        self.assertEqual(columns['volume'].tolist(), [93831500, 16777217, 1, 0, 2 ** 40 + 3])
+
+
+class LoadTestCleanupTests(TestCase):
+    def predict(self, user):
+        return Prediction.objects.create(
+            ticker='TSLA', as_of='2022-03-24', today_price=1.0, base_prediction=1.0, tomorrow_prediction=1.0,
+            adjustment_rule='sentiment_fine_tune', sentiment_score=0.0, overall_sentiment='neutral', user=user,
+        )
+
+    def setUp(self):
+        users = get_user_model().objects
+        self.run_user = users.create_user('loadtest-1a2b3c4d-0')
+        self.other_run_user = users.create_user('loadtest-99999999-0')
+        self.real_user = users.create_user('alice')
+        for user in (self.run_user, self.run_user, self.other_run_user, self.real_user, None):
+            self.predict(user)
+
+    def test_run_accounts_and_their_predictions_are_deleted(self):
+        self.assertEqual(delete_accounts('loadtest-1a2b3c4d-'), (2, 1))
+        self.assertFalse(get_user_model().objects.filter(pk=self.run_user.pk).exists())
+        self.assertEqual(Prediction.objects.count(), 3)
+        # Nothing from the run is left behind as an anonymous forecast
+        self.assertEqual(Prediction.objects.filter(user=None).count(), 1)
+
+    def test_cleanup_command_removes_every_loadtest_account(self):
+        call_command('loadtest', '--cleanup', stdout=io.StringIO())
+        self.assertEqual(list(get_user_model().objects.values_list('username', flat=True)), ['alice'])
+        self.assertEqual(set(Prediction.objects.values_list('user_id', flat=True)), {None, self.real_user.pk})
+        self.assertEqual(Prediction.objects.count(), 2)
+
+
+class ExternalSentimentTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = start_stub_server(latency=1.0)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        market_data = {'BASE_URL': self.server.url, 'FEAR_GREED_URL': f'{self.server.url}/fng/',
+                       'RATE_LIMIT_PER_SEC': 0, 'MAX_RETRIES': 3, 'BACKOFF_FACTOR': 0.5}
+        overrides = override_settings(MARKET_DATA=market_data)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        cache.clear()
+
+    def deadline(self, seconds):
+        return Deadline(seconds, costs=StageCosts({'external_sentiment': 10, 'forecast': 0}))
+
+    def wait_for_refreshes(self):
+        for future in list(sentiment._refreshing.values()):
+            try:
+                future.result(timeout=5)
+            except Exception:
+                pass
+
+    def test_one_refresh_in_flight_per_key(self):
+        release = threading.Event()
+        first = sentiment._refresh('test:key', release.wait, 5)
+        self.assertIs(sentiment._refresh('test:key', release.wait, 5), first)
+        release.set()
+        first.result(timeout=5)
+        self.assertNotIn('test:key', sentiment._refreshing)
+        self.assertIsNot(sentiment._refresh('test:key', lambda: None), first)
+
+    def test_refresh_that_finished_before_registration_does_not_deadlock(self):
+        done = Future()
+        done.set_result(None)
+        with mock.patch.object(sentiment._external_pool, 'submit', return_value=done):
+            self.assertIs(sentiment._refresh('test:done', lambda: None), done)
+        self.assertNotIn('test:done', sentiment._refreshing)
+
+    def test_slow_upstream_is_fetched_within_the_budget_without_retries(self):
+        deadline = self.deadline(0.3)
+        started = time.monotonic()
+        (news_score, headlines), fear_greed = get_external_sentiment('TSLA', deadline)
+        self.assertLess(time.monotonic() - started, 0.8)
+        self.assertEqual((news_score, headlines, fear_greed), (None, [], None))
+        self.assertEqual(deadline.degraded, {'news_sentiment': 'unavailable', 'fear_greed': 'unavailable'})
+
+        # The background fetches give up after the budget instead of retrying with backoff
+        started = time.monotonic()
+        self.wait_for_refreshes()
+        self.assertLess(time.monotonic() - started, 0.8)
+        self.assertEqual(sentiment._refreshing, {})
+
+    def test_failing_upstream_falls_back_to_the_last_good_values(self):
+        down = {'BASE_URL': 'http://127.0.0.1:9', 'FEAR_GREED_URL': 'http://127.0.0.1:9/fng/',
+                'RATE_LIMIT_PER_SEC': 0, 'MAX_RETRIES': 0}
+        cache.set(sentiment.news_cache_key('TSLA'), (0.4, [{'title': 'Cached headline'}]), 60)
+        cache.set(sentiment.FEAR_GREED_CACHE_KEY, {'value': 60}, 60)
+
+        with override_settings(MARKET_DATA=down):
+            deadline = self.deadline(2.0)
+            started = time.monotonic()
+            news, fear_greed = get_external_sentiment('TSLA', deadline)
+            self.assertLess(time.monotonic() - started, 1.0)  # failed fast, did not wait out the budget
+            self.assertEqual(news, (0.4, [{'title': 'Cached headline'}]))
+            self.assertEqual(fear_greed, {'value': 60})
+            self.assertEqual(deadline.degraded, {'news_sentiment': 'stale', 'fear_greed': 'stale'})
+
+            cache.clear()
+            deadline = self.deadline(2.0)
+            self.assertEqual(get_external_sentiment('TSLA', deadline), ((None, []), None))
+            self.assertEqual(deadline.degraded, {'news_sentiment': 'unavailable', 'fear_greed': 'unavailable'})
+
+            # Without a deadline the cached values are served too
+            cache.set(sentiment.FEAR_GREED_CACHE_KEY, {'value': 60}, 60)
+            self.assertEqual(get_external_sentiment('TSLA')[1], {'value': 60})
+
+    def test_queued_refreshes_are_cancelled_when_the_budget_runs_out(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+        busy = [sentiment._external_pool.submit(release.wait, 5) for _ in range(sentiment._external_pool._max_workers)]
+        cache.set(sentiment.FEAR_GREED_CACHE_KEY, {'value': 60}, 60)
+
+        deadline = self.deadline(0.1)
+        _, fear_greed = get_external_sentiment('TSLA', deadline)
+        self.assertEqual(fear_greed, {'value': 60})
+        self.assertEqual(deadline.degraded, {'news_sentiment': 'unavailable', 'fear_greed': 'stale'})
+        self.assertEqual(sentiment._refreshing, {})
+
+        release.set()
+        for future in busy:
+            future.result(timeout=5)
+
+
+class ConstantPredictor:
+    def predict(self, x, batch_size=None):
+        return np.full((len(x), 1), 0.5, dtype=np.float32)
+
+
+class PredictionProfileTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = start_stub_server()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.profile_dir = Path(tmp.name) / 'profiles'
+        overrides = override_settings(
+            MARKET_DATA={'BASE_URL': self.server.url, 'FEAR_GREED_URL': f'{self.server.url}/fng/',
+                         'RATE_LIMIT_PER_SEC': 0},
+            SHARED_DATA={'ENABLED': False},
+            PREDICTION_PROFILE_DIR=str(self.profile_dir),
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        patcher = mock.patch('api.views.get_predictor', return_value=ConstantPredictor())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        users = get_user_model().objects
+        self.staff = users.create_user('staff', is_staff=True)
+        self.member = users.create_user('member')
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def predict(self, user, **extra):
+        # A 1 ms budget skips charts, evaluation and external sentiment; the forecast always runs
+        query = extra.pop('query', '')
+        response = self.client_for(user).post(f'/api/v1/predict/{query}', {'ticker': 'TSLA', 'deadline_ms': 1},
+                                              format='json', **extra)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('tomorrow_prediction', response.data, response.data)
+        return response.data
+
+    def test_non_staff_requests_are_not_profiled(self):
+        self.assertNotIn('profile', self.predict(self.member, query='?profile=1'))
+        self.assertNotIn('profile', self.predict(self.member, HTTP_X_PROFILE='1'))
+        self.assertFalse(self.profile_dir.exists() and any(self.profile_dir.iterdir()))
+
+    def test_staff_get_a_stage_report_and_download_link(self):
+        profile = self.predict(self.staff, HTTP_X_PROFILE='1')['profile']
+        self.assertEqual(list(profile['stages']), ['fetch', 'charts', 'evaluation', 'sentiment', 'forecast',
+                                                   'adjustment', 'store'])
+        self.assertEqual(set(profile['stages']['forecast']), {'wall_ms', 'top'})
+        self.assertIn('/api/v1/predict/profiles/', profile['download'])
+
+        path = profile['download'].split('testserver', 1)[1]
+        response = self.client_for(self.staff).get(path)
+        self.assertEqual(response.status_code, 200)
+        response.close()
+        self.assertEqual(self.client_for(self.member).get(path).status_code, 403)
+
+    def test_only_prof_files_are_served(self):
+        self.profile_dir.mkdir()
+        (self.profile_dir / 'notes.txt').write_text('secret')
+        client = self.client_for(self.staff)
+        self.assertEqual(client.get('/api/v1/predict/profiles/notes.txt/').status_code, 404)
+        self.assertEqual(client.get('/api/v1/predict/profiles/missing.prof/').status_code, 404)
+        self.assertEqual(self.client_for(self.member).get('/api/v1/predict/profiles/notes.txt/').status_code, 403)
+
+    def test_unwritable_profile_dir_keeps_the_forecast(self):
+        blocker = self.profile_dir.parent / 'not-a-directory'
+        blocker.write_text('')
+        with override_settings(PREDICTION_PROFILE_DIR=str(blocker / 'profiles')), \
+                self.assertLogs('api.views', 'ERROR'):
+            profile = self.predict(self.staff, query='?profile=1')['profile']
+        self.assertIsNone(profile['download'])
+        self.assertIn('Could not save the profile', profile['error'])
+        self.assertIn('forecast', profile['stages'])
@@ -0,0 +1,125 @@
+"""
+Local Upstream Stand-ins
+
+A small threaded HTTP server that speaks the stand-in protocol of
+api/market_data.py, so the app can run without Yahoo or Alternative.me:
+
+    GET /history?symbols=A,B&period=10y -> {"A": {"date": [...], "close": [...], "volume": [...]}, ...}
+    GET /news?symbol=A                  -> [{"title": ...}, ...]
+    GET /fng/?limit=1                   -> Alternative.me Fear & Greed payload
+
+History is served from Resources/<TICKER>.csv when present. Other tickers get
+the TSLA series rescaled by a per-ticker factor, so any symbol mix works.
+"""
+
+import csv
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+RESOURCES_DIR = Path(__file__).resolve().parent.parent.parent / 'Resources'
+FALLBACK_TICKER = 'TSLA'
+PERIOD_DAYS = {'1y': 252, '2y': 504, '5y': 1260, '10y': 2520}
+
+HEADLINES = [
+    '{ticker} beats earnings expectations as revenue surges',
+    '{ticker} shares slip after analyst downgrade',
+    'Investors weigh outlook for {ticker} ahead of product launch',
+    '{ticker} announces record deliveries, stock rallies',
+    'Regulators open inquiry into {ticker} disclosures',
+]
+
+
+def _load_csv(path):
+    dates, close, volume = [], [], []
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            try:
+                close.append(float(row['Close']))
+                volume.append(float(row['Volume']))
+            except (KeyError, ValueError):
+                continue
+            dates.append(row['Date'])
+    return {'date': dates, 'close': close, 'volume': volume}
+
+
+class StubData:
+    """Price series keyed by ticker, loaded once from Resources/*.csv."""
+
+    def __init__(self, resources_dir=RESOURCES_DIR):
+        self.series = {}
+        for path in Path(resources_dir).glob('*.csv'):
+            data = _load_csv(path)
+            if data['close']:
+                self.series[path.stem.upper()] = data
+
+    def history(self, ticker, period):
+        data = self.series.get(ticker)
+        if data is None:
+            base = self.series.get(FALLBACK_TICKER)
+            if base is None:
+                return {}
+            # Deterministic per-ticker price level so different symbols look different
+            factor = 0.5 + (zlib.crc32(ticker.encode()) % 1000) / 500
+            data = {**base, 'close': [round(c * factor, 4) for c in base['close']]}
+
+        days = PERIOD_DAYS.get(period)
+        if days is None:
+            return data
+        return {key: values[-days:] for key, values in data.items()}
+
+    def news(self, ticker):
+        return [{'title': headline.format(ticker=ticker)} for headline in HEADLINES]
+
+    def fear_greed(self):
+        return {'data': [{'value': '55', 'value_classification': 'Greed', 'timestamp': str(int(time.time()))}]}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real upstreams
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        data = self.server.stub_data
+        if self.server.latency:
+            time.sleep(self.server.latency)
+
+        if url.path == '/history':
+            symbols = [s for s in query.get('symbols', '').upper().split(',') if s]
+            body = {symbol: data.history(symbol, query.get('period', '10y')) for symbol in symbols}
+        elif url.path == '/news':
+            body = data.news(query.get('symbol', '').upper())
+        elif url.path.rstrip('/') == '/fng':
+            body = data.fear_greed()
+        else:
+            self.send_error(404)
+            return
+
+        payload = json.dumps(body).encode()
+        try:
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True  # the client timed out while we were "slow"
+
+    def log_message(self, *args):
+        pass
+
+
+def start_stub_server(host='127.0.0.1', port=0, latency=0.0, resources_dir=RESOURCES_DIR):
+    """Start the stand-in server on a daemon thread and return it; server.url is its base URL."""
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.stub_data = StubData(resources_dir)
+    server.latency = latency
+    server.url = f'http://{host}:{server.server_port}'
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
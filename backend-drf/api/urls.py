@@ -2,7 +2,7 @@ from accounts.views import RegisterView
 from django.urls import path
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView, TokenVerifyView
 from accounts.views import ProtectedView
-from api.views import StockPredictionAPIView
+from api.views import StockPredictionAPIView, PredictionLoadView, PredictionProfileView, ExportView
 urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
     path('token/', TokenObtainPairView.as_view(), name='access_token'),
@@ -10,4 +10,7 @@ urlpatterns = [
     path('token/verify/', TokenVerifyView.as_view(), name='verify_token'),
     path('protected/', ProtectedView.as_view(), name='protected'),
     path('predict/', StockPredictionAPIView.as_view(), name='predict'),
+    path('predict/load/', PredictionLoadView.as_view(), name='predict_load'),
+    path('predict/profiles/<str:name>/', PredictionProfileView.as_view(), name='predict_profile'),
+    path('export/', ExportView.as_view(), name='export'),
 ]
@@ -1,206 +1,311 @@
-import os
+import logging
+import time
+from pathlib import Path
 import numpy as np
-import pandas as pd
 import matplotlib
 matplotlib.use('AGG')  # Set backend once at module level
 import matplotlib.pyplot as plt
-import yfinance as yf
+from django.conf import settings
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.urls import reverse
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from sklearn.preprocessing import MinMaxScaler
 from sklearn.metrics import mean_squared_error, r2_score
-from keras.models import load_model
-from .serializers import StockPredictionSerializer
+from .serializers import StockPredictionSerializer, ExportSerializer
+from .models import Prediction
+from .export import FORMATS, resolve_format, stream_export
 from .utils import save_plot
 from .sentiment import get_sentiment_summary
+from .market_data import MarketDataError
+from .shared_data import get_shared_history
+from .inference import get_predictor
+from .profiling import StageProfiler
+from .deadline import Deadline, stage_costs
+from .admission import AdmissionControlMixin, prediction_admission
+from .adjustment import adjust_predictions, RULES, CONFLICT_BEARISH, CONFLICT_BULLISH, LARGE_MOVE
+from .series import WINDOW, minmax_fit, minmax_transform, minmax_inverse, windows
 
-# Configure yfinance cache to a writable location
-cache_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), '.yf_cache')
-os.makedirs(cache_dir, exist_ok=True)
-yf.set_tz_cache_location(cache_dir)
+logger = logging.getLogger(__name__)
 
 
-class StockPredictionAPIView(APIView):
+def price_charts(ticker, close, ma100, ma200):
+    """Closing price, 100 DMA and 200 DMA charts as base64 data URLs."""
+    # 1. Basic closing price plot
+    plt.figure(figsize=(17.3, 7.2))
+    plt.plot(close, label='Closing Price')
+    plt.title(f'Closing price of {ticker}')
+    plt.xlabel('Days')
+    plt.ylabel('Price')
+    plt.legend()
+    plot_img = save_plot(f'{ticker}_plot.png')
+
+    # 2. 100 DMA plot
+    plt.figure(figsize=(17.3, 7.2))
+    plt.plot(close, label='Closing Price')
+    plt.plot(ma100, 'r', label='100 DMA')
+    plt.title(f'100 Days Moving Average of {ticker}')
+    plt.xlabel('Days')
+    plt.ylabel('Price')
+    plt.legend()
+    plot_100_dma = save_plot(f'{ticker}_100_dma.png')
+
+    # 3. 200 DMA plot
+    plt.figure(figsize=(17.3, 7.2))
+    plt.plot(close, label='Closing Price')
+    plt.plot(ma100, 'r', label='100 DMA')
+    plt.plot(ma200, 'g', label='200 DMA')
+    plt.title(f'200 Days Moving Average of {ticker}')
+    plt.xlabel('Days')
+    plt.ylabel('Price')
+    plt.legend()
+    plot_200_dma = save_plot(f'{ticker}_200_dma.png')
+
+    return plot_img, plot_100_dma, plot_200_dma
+
+
+def evaluate_model(ticker, close, model):
+    """
+    Accuracy of the LSTM over recent history against a naive previous-day forecast.
+    Returns (evaluation metrics, prediction chart as a base64 data URL).
+    """
+    # Use recent data for more realistic evaluation
+    # Take last 500 days (or available) for evaluation
+    eval_days = min(500, len(close) - WINDOW)
+    eval_data = close[-(eval_days + WINDOW):]
+
+    # Fit scaler on evaluation window for proper scaling
+    eval_lo, eval_rng = minmax_fit(eval_data)
+    eval_scaled = minmax_transform(eval_data, eval_lo, eval_rng)
+
+    # Sequences for evaluation are strided views over the scaled window
+    x_eval = windows(eval_scaled)
+
+    y_pred_scaled = model.predict(x_eval)
+
+    # Inverse transform to get original prices
+    y_predicted = minmax_inverse(y_pred_scaled.ravel(), eval_lo, eval_rng)
+    y_actual = eval_data[WINDOW:]
+
+    # Also get previous day prices for baseline comparison
+    y_prev_day = eval_data[WINDOW - 1:-1]  # Previous day as naive forecast
+
+    # 4. Prediction plot with better visualization
+    plt.figure(figsize=(17.3, 7.2))
+    plt.subplot(1, 2, 1)
+    plt.plot(y_actual, 'b', label='Actual Price', alpha=0.7)
+    plt.plot(y_predicted, 'r', label='Predicted Price', alpha=0.7)
+    plt.title(f'Price Prediction for {ticker}')
+    plt.xlabel('Days')
+    plt.ylabel('Price ($)')
+    plt.legend()
+    plt.grid(True, alpha=0.3)
+
+    # Add scatter plot for correlation
+    plt.subplot(1, 2, 2)
+    plt.scatter(y_actual, y_predicted, alpha=0.5, s=10)
+    min_val = min(y_actual.min(), y_predicted.min())
+    max_val = max(y_actual.max(), y_predicted.max())
+    plt.plot([min_val, max_val], [min_val, max_val], 'r--', label='Perfect Prediction')
+    plt.xlabel('Actual Price ($)')
+    plt.ylabel('Predicted Price ($)')
+    plt.title('Actual vs Predicted Correlation')
+    plt.legend()
+    plt.grid(True, alpha=0.3)
+    plt.tight_layout()
+    plot_prediction = save_plot(f'{ticker}_final_prediction.png')
+
+    # ============ IMPROVED MODEL EVALUATION ============
+
+    # Basic metrics
+    mse = mean_squared_error(y_actual, y_predicted)
+    rmse = np.sqrt(mse)
+    mae = np.mean(np.abs(y_actual - y_predicted))
+
+    # MAPE (Mean Absolute Percentage Error) - more interpretable
+    mape = np.mean(np.abs((y_actual - y_predicted) / y_actual)) * 100
+
+    # R² Score
+    r2 = r2_score(y_actual, y_predicted)
+
+    # Directional Accuracy - did we predict the right direction?
+    actual_direction = np.diff(y_actual) > 0  # True if price went up
+    pred_direction = (y_predicted[1:] - y_actual[:-1]) > 0  # Did we predict up?
+    directional_accuracy = np.mean(actual_direction == pred_direction) * 100
+
+    # Baseline comparison (Naive forecast: tomorrow = today)
+    baseline_mse = mean_squared_error(y_actual, y_prev_day)
+    baseline_rmse = np.sqrt(baseline_mse)
+    baseline_mape = np.mean(np.abs((y_actual - y_prev_day) / y_actual)) * 100
+
+    # Model Skill Score (how much better than baseline)
+    # skill_score > 0 means model is better than naive forecast
+    skill_score = 1 - (mse / baseline_mse) if baseline_mse > 0 else 0
+
+    # Compile evaluation results
+    evaluation = {
+        'mse': round(float(mse), 2),
+        'rmse': round(float(rmse), 2),
+        'mae': round(float(mae), 2),
+        'mape': round(float(mape), 2),
+        'r2': round(float(r2), 4),
+        'directional_accuracy': round(float(directional_accuracy), 1),
+        'baseline_rmse': round(float(baseline_rmse), 2),
+        'baseline_mape': round(float(baseline_mape), 2),
+        'skill_score': round(float(skill_score), 4),
+        'eval_period_days': eval_days
+    }
+
+    return evaluation, plot_prediction
+
+
+class PredictionLoadView(APIView):
+    def get(self, request):
+        # Current in-flight / queued prediction counts for this worker process,
+        # plus the stage cost estimates used for request deadlines
+        return Response({**prediction_admission.snapshot(), 'stage_estimates_ms': stage_costs.snapshot()})
+
+
+class ExportView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        serializer = ExportSerializer(data=request.query_params)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        params = serializer.validated_data
+
+        # Encoded ticker by ticker while the client reads, so memory stays flat for any size of export
+        fmt = resolve_format(params['fmt'])
+        content_type, extension = FORMATS[fmt]
+        response = StreamingHttpResponse(
+            stream_export(params['tickers'], params['start'], params['end'], fmt),
+            content_type=content_type,
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="export_{params["start"]}_{params["end"]}.{extension}"'
+        )
+        return response
+
+
+class PredictionProfileView(APIView):
+    permission_classes = [IsAdminUser]
+
+    def get(self, request, name):
+        # .prof files written by profiled /predict/ requests (load with pstats or snakeviz)
+        path = Path(settings.PREDICTION_PROFILE_DIR) / name
+        if path.suffix != '.prof' or not path.is_file():
+            raise Http404
+        return FileResponse(open(path, 'rb'), as_attachment=True, filename=name)
+
+
+class StockPredictionAPIView(AdmissionControlMixin, APIView):
+    def initial(self, request, *args, **kwargs):
+        # The request deadline also counts time spent waiting for an admission slot
+        self.received_at = time.monotonic()
+        super().initial(request, *args, **kwargs)
+
+    def profile_report(self, request, profiler, ticker):
+        if not profiler.profile_cpu:
+            return {'error': "Another request is being profiled by this worker; try again."}
+        report = {'stages': profiler.cpu_report(), 'download': None}
+        # An unwritable profile directory must not cost the client the forecast
+        try:
+            name = profiler.save(settings.PREDICTION_PROFILE_DIR, ticker)
+        except OSError as e:
+            logger.exception("Could not save the %s profile", ticker)
+            report['error'] = f"Could not save the profile: {e}"
+            return report
+        if name:
+            report['download'] = request.build_absolute_uri(reverse('predict_profile', args=[name]))
+        return report
+
     def post(self, request):
         serializer = StockPredictionSerializer(data=request.data)
         if serializer.is_valid():
             ticker = serializer.validated_data['ticker'].upper()
 
+            # Per-stage peak allocation report (settings flag, or ?memory_profile=1 in DEBUG)
+            # Per-stage cProfile for staff users only (X-Profile: 1 header or ?profile=1)
+            profiler = StageProfiler(
+                trace_memory=getattr(settings, 'PREDICTION_MEMORY_PROFILE', False) or (
+                    settings.DEBUG and request.query_params.get('memory_profile') == '1'
+                ),
+                profile_cpu=request.user.is_staff and (
+                    request.headers.get('X-Profile') == '1' or request.query_params.get('profile') == '1'
+                ),
+            )
+
+            # Latency budget: client's deadline_ms or the server default (api/deadline.py)
+            deadline = Deadline.for_request(serializer.validated_data.get('deadline_ms'), started_at=self.received_at)
+
             try:
-                # Fetch stock data from yfinance
-                stock = yf.Ticker(ticker)
-                df = stock.history(period="10y")
+                # Fetch stock data through the cross-worker shared store (upstream on a miss)
+                # History arrives as contiguous float32 arrays with NaN rows already dropped
+                profiler.stage('fetch')
+                shared = get_shared_history(ticker, period="10y")
+                history = shared.history
                 
-                if df is None or df.empty:
+                if len(history) == 0:
                     return Response({
                         "error": f"No data found for ticker '{ticker}'. Please check if it's a valid stock symbol.",
                         'status': status.HTTP_404_NOT_FOUND
                     })
                 
-                if 'Close' not in df.columns:
-                    return Response({
-                        "error": f"Invalid data structure for ticker '{ticker}'. Missing Close price data.",
-                        'status': status.HTTP_500_INTERNAL_SERVER_ERROR
-                    })
-                
-                # Extract Close prices and Volume, drop NaN values
-                df_full = df[['Close', 'Volume']].dropna()
-                volume_data = df_full['Volume'].values
-                df = df_full[['Close']]
-                
-                # Calculate moving averages
-                ma100 = df['Close'].rolling(100).mean()
-                ma200 = df['Close'].rolling(200).mean()
-                
-                # Generate plots
-                # 1. Basic closing price plot
-                plt.figure(figsize=(17.3, 7.2))
-                plt.plot(df['Close'].values, label='Closing Price')
-                plt.title(f'Closing price of {ticker}')
-                plt.xlabel('Days')
-                plt.ylabel('Price')
-                plt.legend()
-                plot_img = save_plot(f'{ticker}_plot.png')
-                
-                # 2. 100 DMA plot
-                plt.figure(figsize=(17.3, 7.2))
-                plt.plot(df['Close'].values, label='Closing Price')
-                plt.plot(ma100.values, 'r', label='100 DMA')
-                plt.title(f'100 Days Moving Average of {ticker}')
-                plt.xlabel('Days')
-                plt.ylabel('Price')
-                plt.legend()
-                plot_100_dma = save_plot(f'{ticker}_100_dma.png')
-
-                # 3. 200 DMA plot
-                plt.figure(figsize=(17.3, 7.2))
-                plt.plot(df['Close'].values, label='Closing Price')
-                plt.plot(ma100.values, 'r', label='100 DMA')
-                plt.plot(ma200.values, 'g', label='200 DMA')
-                plt.title(f'200 Days Moving Average of {ticker}')
-                plt.xlabel('Days')
-                plt.ylabel('Price')
-                plt.legend()
-                plot_200_dma = save_plot(f'{ticker}_200_dma.png')
-
-                # Use recent data for more realistic evaluation
-                # Take last 500 days (or available) for evaluation
-                eval_days = min(500, len(df) - 100)
-                eval_data = df['Close'].tail(eval_days + 100).values.reshape(-1, 1)
-                
-                # Fit scaler on evaluation window for proper scaling
-                eval_scaler = MinMaxScaler(feature_range=(0, 1))
-                eval_scaler.fit(eval_data)
-                eval_scaled = eval_scaler.transform(eval_data)
-                
-                # Create sequences for evaluation
-                x_eval, y_eval = [], []
-                for i in range(100, len(eval_scaled)):
-                    x_eval.append(eval_scaled[i-100:i, 0])
-                    y_eval.append(eval_scaled[i, 0])
-                
-                x_eval = np.array(x_eval).reshape(-1, 100, 1)
-                y_eval = np.array(y_eval)
-                
-                # Load model and make predictions
-                model = load_model('stock_prediction_model.keras')
-                y_pred_scaled = model.predict(x_eval)
-                
-                # Inverse transform to get original prices
-                y_predicted = eval_scaler.inverse_transform(y_pred_scaled).flatten()
-                y_actual = eval_scaler.inverse_transform(y_eval.reshape(-1, 1)).flatten()
-                
-                # Also get previous day prices for baseline comparison
-                y_prev_day = eval_data[99:-1].flatten()  # Previous day as naive forecast
-                
-                # 4. Prediction plot with better visualization
-                plt.figure(figsize=(17.3, 7.2))
-                plt.subplot(1, 2, 1)
-                plt.plot(y_actual, 'b', label='Actual Price', alpha=0.7)
-                plt.plot(y_predicted, 'r', label='Predicted Price', alpha=0.7)
-                plt.title(f'Price Prediction for {ticker}')
-                plt.xlabel('Days')
-                plt.ylabel('Price ($)')
-                plt.legend()
-                plt.grid(True, alpha=0.3)
-                
-                # Add scatter plot for correlation
-                plt.subplot(1, 2, 2)
-                plt.scatter(y_actual, y_predicted, alpha=0.5, s=10)
-                min_val = min(y_actual.min(), y_predicted.min())
-                max_val = max(y_actual.max(), y_predicted.max())
-                plt.plot([min_val, max_val], [min_val, max_val], 'r--', label='Perfect Prediction')
-                plt.xlabel('Actual Price ($)')
-                plt.ylabel('Predicted Price ($)')
-                plt.title('Actual vs Predicted Correlation')
-                plt.legend()
-                plt.grid(True, alpha=0.3)
-                plt.tight_layout()
-                plot_prediction = save_plot(f'{ticker}_final_prediction.png')
-                
-                # ============ IMPROVED MODEL EVALUATION ============
-                
-                # Basic metrics
-                mse = mean_squared_error(y_actual, y_predicted)
-                rmse = np.sqrt(mse)
-                mae = np.mean(np.abs(y_actual - y_predicted))
-                
-                # MAPE (Mean Absolute Percentage Error) - more interpretable
-                mape = np.mean(np.abs((y_actual - y_predicted) / y_actual)) * 100
-                
-                # R² Score
-                r2 = r2_score(y_actual, y_predicted)
-                
-                # Directional Accuracy - did we predict the right direction?
-                actual_direction = np.diff(y_actual) > 0  # True if price went up
-                pred_direction = (y_predicted[1:] - y_actual[:-1]) > 0  # Did we predict up?
-                directional_accuracy = np.mean(actual_direction == pred_direction) * 100
+                close = history.close
+                volume_data = history.volume
                 
-                # Baseline comparison (Naive forecast: tomorrow = today)
-                baseline_mse = mean_squared_error(y_actual, y_prev_day)
-                baseline_rmse = np.sqrt(baseline_mse)
-                baseline_mape = np.mean(np.abs((y_actual - y_prev_day) / y_actual)) * 100
+                # Moving averages are published alongside the history
+                ma100 = shared.ma100
+                ma200 = shared.ma200
                 
-                # Model Skill Score (how much better than baseline)
-                # skill_score > 0 means model is better than naive forecast
-                skill_score = 1 - (mse / baseline_mse) if baseline_mse > 0 else 0
-                
-                # Compile evaluation results
-                evaluation = {
-                    'mse': round(mse, 2),
-                    'rmse': round(rmse, 2),
-                    'mae': round(mae, 2),
-                    'mape': round(mape, 2),
-                    'r2': round(r2, 4),
-                    'directional_accuracy': round(directional_accuracy, 1),
-                    'baseline_rmse': round(baseline_rmse, 2),
-                    'baseline_mape': round(baseline_mape, 2),
-                    'skill_score': round(skill_score, 4),
-                    'eval_period_days': eval_days
-                }
+                # Optional stages are skipped when the rest of the pipeline would not fit in the deadline
+                # 1. Charts go first
+                profiler.stage('charts')
+                plot_img = plot_100_dma = plot_200_dma = None
+                if deadline.allows('charts'):
+                    with deadline.timed('charts'):
+                        plot_img, plot_100_dma, plot_200_dma = price_charts(ticker, close, ma100, ma200)
+                else:
+                    deadline.degrade('charts', 'skipped')
+
+                # 2. Then the evaluation (and its chart)
+                profiler.stage('evaluation')
+                evaluation = plot_prediction = None
+                if deadline.allows('evaluation'):
+                    # Serving model is loaded once per process (float32 or a vetted reduced-precision variant)
+                    model = get_predictor()
+                    with deadline.timed('evaluation'):
+                        evaluation, plot_prediction = evaluate_model(ticker, close, model)
+                else:
+                    deadline.degrade('evaluation', 'skipped')
 
                 # Get today's closing price for comparison
-                today_price = df['Close'].iloc[-1]
+                today_price = float(close[-1])
                 
                 # Get sentiment analysis BEFORE prediction to use in adjustment
+                # 3. News and Fear & Greed fall back to their last good values when time runs short
+                profiler.stage('sentiment')
                 sentiment_data = get_sentiment_summary(
                     ticker, 
-                    df['Close'].values, 
-                    volume_data
+                    close, 
+                    volume_data,
+                    deadline=deadline,
                 )
                 
                 # Predict tomorrow's price using the last 100 days
                 # Use a scaler fit on recent data to avoid scale mismatch
-                last_100_days = df['Close'].tail(100).values.reshape(-1, 1)
-                tomorrow_scaler = MinMaxScaler(feature_range=(0, 1))
-                tomorrow_scaler.fit(last_100_days)
-                last_100_scaled = tomorrow_scaler.transform(last_100_days)
-                x_tomorrow = np.array([last_100_scaled.flatten()]).reshape(1, 100, 1)
-                tomorrow_prediction_scaled = model.predict(x_tomorrow)
-                base_prediction = tomorrow_scaler.inverse_transform(tomorrow_prediction_scaled)[0][0]
+                profiler.stage('forecast')
+                last_100_days = close[-WINDOW:]
+                tomorrow_lo, tomorrow_rng = minmax_fit(last_100_days)
+                x_tomorrow = minmax_transform(last_100_days, tomorrow_lo, tomorrow_rng).reshape(1, WINDOW, 1)
+                with deadline.timed('forecast'):
+                    tomorrow_prediction_scaled = get_predictor().predict(x_tomorrow)
+                base_prediction = float(minmax_inverse(tomorrow_prediction_scaled[0][0], tomorrow_lo, tomorrow_rng))
                 
                 # Apply sentiment adjustment to the prediction
+                profiler.stage('adjustment')
                 # Overall sentiment score ranges from -1 (very bearish) to +1 (very bullish)
                 overall_sentiment = sentiment_data.get('overall_sentiment', 'neutral')
                 sentiment_score = sentiment_data.get('sentiment_score', 0)
@@ -208,68 +313,18 @@ class StockPredictionAPIView(APIView):
                 # Calculate base price change predicted by LSTM
                 base_change_pct = ((base_prediction - today_price) / today_price) * 100
                 
-                # Sentiment-aware prediction adjustment
+                # Sentiment-aware prediction adjustment (rules live in api/adjustment.py)
                 # Key principle: If LSTM predicts big move but sentiment disagrees, we should be cautious
-                
-                lstm_bullish = base_change_pct > 2  # LSTM predicts >2% increase
-                lstm_bearish = base_change_pct < -2  # LSTM predicts >2% decrease
-                is_bearish = overall_sentiment == 'bearish' or sentiment_score < -0.1
-                is_bullish = overall_sentiment == 'bullish' or sentiment_score > 0.1
-                
-                if lstm_bullish and is_bearish:
-                    # CONTRADICTION: LSTM says big up, but sentiment is bearish
-                    # Significantly reduce the predicted gain
-                    # For bearish sentiment, cap the upside and potentially reverse to slight decline
-                    
-                    # Map sentiment_score from [-1, 0] to dampening [0.1, 0.5]
-                    # More negative sentiment = more dampening
-                    dampening = max(0.1, 0.5 + sentiment_score * 0.4)  # Range: 0.1 to 0.5
-                    
-                    # If very bearish (score < -0.3), consider predicting slight decline
-                    if sentiment_score < -0.3:
-                        # Flip to slight negative
-                        adjusted_change = -abs(base_change_pct) * 0.1  # Small decline
-                    else:
-                        # Just dampen the gain significantly
-                        adjusted_change = base_change_pct * dampening
-                    
-                    tomorrow_prediction = today_price * (1 + adjusted_change / 100)
-                    
-                elif lstm_bearish and is_bullish:
-                    # CONTRADICTION: LSTM says big down, but sentiment is bullish
-                    # Reduce the predicted decline
-                    
-                    dampening = max(0.1, 0.5 - sentiment_score * 0.4)  # Range: 0.1 to 0.5
-                    
-                    if sentiment_score > 0.3:
-                        # Flip to slight positive
-                        adjusted_change = abs(base_change_pct) * 0.1
-                    else:
-                        adjusted_change = base_change_pct * dampening
-                    
-                    tomorrow_prediction = today_price * (1 + adjusted_change / 100)
-                    
-                elif abs(base_change_pct) > 5:
-                    # LSTM predicts large move (>5%) - be conservative regardless of sentiment
-                    # Large predictions are often unreliable
-                    conservative_factor = 0.3  # Cap at 30% of predicted move
-                    adjusted_change = base_change_pct * conservative_factor
-                    tomorrow_prediction = today_price * (1 + adjusted_change / 100)
-                    
-                else:
-                    # Normal case - LSTM and sentiment roughly agree or small prediction
-                    # Apply sentiment-based fine-tuning
-                    sentiment_adjustment = sentiment_score * 0.02  # ±2% max from sentiment
-                    
-                    # RSI contribution
-                    rsi = sentiment_data.get('rsi')
-                    if rsi is not None:
-                        if rsi > 70:
-                            sentiment_adjustment -= 0.01 * ((rsi - 70) / 30)
-                        elif rsi < 30:
-                            sentiment_adjustment += 0.01 * ((30 - rsi) / 30)
-                    
-                    tomorrow_prediction = base_prediction * (1 + sentiment_adjustment)
+                rsi = sentiment_data.get('rsi')
+                adjusted, rule_index = adjust_predictions(
+                    today_price,
+                    base_prediction,
+                    sentiment_score,
+                    overall_sentiment,
+                    rsi if rsi is not None else np.nan,
+                )
+                tomorrow_prediction = float(adjusted)
+                applied_rule = RULES[int(rule_index)]
                 
                 # Store adjustment info for transparency
                 adjustment_pct = ((tomorrow_prediction - base_prediction) / base_prediction) * 100
@@ -285,8 +340,8 @@ class StockPredictionAPIView(APIView):
                     summary_points.append(f"The model predicts a {abs(price_change_pct):.2f}% decrease based on recent price patterns.")
                 
                 # 2. Recent trend (last 5 days)
-                last_5_days = df['Close'].tail(5)
-                recent_trend = ((last_5_days.iloc[-1] - last_5_days.iloc[0]) / last_5_days.iloc[0]) * 100
+                last_5_days = close[-5:]
+                recent_trend = float((last_5_days[-1] - last_5_days[0]) / last_5_days[0]) * 100
                 if recent_trend > 1:
                     summary_points.append(f"Short-term momentum is bullish (+{recent_trend:.2f}% over 5 days).")
                 elif recent_trend < -1:
@@ -295,14 +350,14 @@ class StockPredictionAPIView(APIView):
                     summary_points.append("Short-term momentum is neutral (sideways movement).")
                 
                 # 3. Position relative to 100 DMA
-                current_ma100 = ma100.iloc[-1]
+                current_ma100 = float(ma100[-1])
                 if today_price > current_ma100:
                     summary_points.append(f"Price is above 100-day moving average (${current_ma100:.2f}), indicating bullish trend.")
                 else:
                     summary_points.append(f"Price is below 100-day moving average (${current_ma100:.2f}), indicating bearish trend.")
                 
                 # 4. Position relative to 200 DMA
-                current_ma200 = ma200.iloc[-1]
+                current_ma200 = float(ma200[-1])
                 if today_price > current_ma200:
                     summary_points.append(f"Price is above 200-day moving average (${current_ma200:.2f}), a long-term bullish signal.")
                 else:
@@ -317,13 +372,13 @@ class StockPredictionAPIView(APIView):
                 # 6. Sentiment-adjusted prediction explanation
                 final_change_pct = ((tomorrow_prediction - today_price) / today_price) * 100
                 
-                if lstm_bullish and is_bearish:
+                if applied_rule == CONFLICT_BEARISH:
                     summary_points.append(f"⚠️ CONFLICT: LSTM predicted +{base_change_pct:.1f}% but sentiment is BEARISH (score: {sentiment_score:.2f}).")
                     summary_points.append(f"Prediction adjusted from ${base_prediction:.2f} to ${tomorrow_prediction:.2f} ({final_change_pct:+.1f}%).")
-                elif lstm_bearish and is_bullish:
+                elif applied_rule == CONFLICT_BULLISH:
                     summary_points.append(f"⚠️ CONFLICT: LSTM predicted {base_change_pct:.1f}% but sentiment is BULLISH (score: {sentiment_score:.2f}).")
                     summary_points.append(f"Prediction adjusted from ${base_prediction:.2f} to ${tomorrow_prediction:.2f} ({final_change_pct:+.1f}%).")
-                elif abs(base_change_pct) > 5:
+                elif applied_rule == LARGE_MOVE:
                     summary_points.append(f"⚠️ LSTM predicted large move ({base_change_pct:+.1f}%) - applying conservative cap.")
                     summary_points.append(f"Prediction adjusted from ${base_prediction:.2f} to ${tomorrow_prediction:.2f} ({final_change_pct:+.1f}%).")
                 elif abs(adjustment_pct) > 0.1:
@@ -367,7 +422,7 @@ class StockPredictionAPIView(APIView):
                 score = sentiment_data['sentiment_score']
                 summary_points.append(f"Overall market sentiment: {overall.upper()} (score: {score}).")
 
-                return Response({
+                response_data = {
                     'status': 'success',
                     'plot_img': plot_img,
                     'plot_100_dma': plot_100_dma,
@@ -377,13 +432,52 @@ class StockPredictionAPIView(APIView):
                     'tomorrow_prediction': round(float(tomorrow_prediction), 2),
                     'base_prediction': round(float(base_prediction), 2),
                     'sentiment_adjustment_pct': round(adjustment_pct, 2),
+                    'adjustment_rule': applied_rule,
                     'today_price': round(float(today_price), 2),
                     'prediction_summary': summary_points,
-                    'sentiment': sentiment_data
-                })
+                    'sentiment': sentiment_data,
+                    # Parts skipped or served stale to meet the deadline, e.g. {'charts': 'skipped'}
+                    'degraded': deadline.degraded,
+                    'deadline_ms': round(deadline.budget_seconds * 1000),
+                }
                 
+                # Keep the forecast for bulk export (/export/) and later scoring;
+                # failing to store it must not cost the client the forecast
+                profiler.stage('store')
+                try:
+                    Prediction.objects.create(
+                        ticker=ticker,
+                        as_of=history.dates[-1].item(),
+                        today_price=today_price,
+                        base_prediction=base_prediction,
+                        tomorrow_prediction=tomorrow_prediction,
+                        adjustment_rule=applied_rule,
+                        sentiment_score=float(sentiment_score),
+                        overall_sentiment=overall_sentiment,
+                        user=request.user if request.user.is_authenticated else None,
+                    )
+                except Exception:
+                    logger.exception("Could not store the %s prediction", ticker)
+                
+                memory_profile = profiler.finish()
+                if memory_profile is not None:
+                    response_data['memory_profile'] = memory_profile
+                if profiler.cpu_requested:
+                    response_data['profile'] = self.profile_report(request, profiler, ticker)
+                
+                return Response(response_data)
+                
+            except MarketDataError as e:
+                return Response({
+                    "error": str(e),
+                    'status': status.HTTP_500_INTERNAL_SERVER_ERROR
+                })
             except Exception as e:
                 return Response({
                     "error": f"Error processing prediction: {str(e)}",
                     'status': status.HTTP_500_INTERNAL_SERVER_ERROR
                 })
+            finally:
+                profiler.finish()
+
+        return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,44 @@
+"""
+Gunicorn settings for multi-worker deployments.
+
+    gunicorn -c gunicorn.conf.py stock_prediction_main.wsgi
+
+The app (and, with PRELOAD_MODEL=True, the model) is loaded once in the master
+before forking, so workers share those pages copy-on-write. Price histories
+are shared through api/shared_data.py; warm them with
+`python manage.py publish_histories ...`.
+"""
+
+import os
+
+from stock_prediction_main.settings import PREDICTION_ADMISSION
+
+# Every running or queued /predict/ holds a worker thread (api/admission.py), so
+# a worker needs MAX_CONCURRENT + MAX_QUEUE threads for predictions plus spare
+# ones that keep token/, register/ and the other cheap endpoints responsive.
+PREDICTION_THREADS = PREDICTION_ADMISSION['MAX_CONCURRENT'] + PREDICTION_ADMISSION['MAX_QUEUE']
+SPARE_THREADS = int(os.environ.get('GUNICORN_SPARE_THREADS', 2))
+
+bind = os.environ.get('GUNICORN_BIND', '127.0.0.1:8000')
+workers = int(os.environ.get('GUNICORN_WORKERS', 4))
+threads = int(os.environ.get('GUNICORN_THREADS', PREDICTION_THREADS + SPARE_THREADS))
+preload_app = True
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+
+
+def post_fork(server, worker):
+    # Per-process resources must not be shared with the master after fork
+    from django.db import connections
+    from api.market_data import reset_client
+
+    connections.close_all()
+    reset_client()
+
+
+def on_starting(server):
+    if server.cfg.threads <= PREDICTION_THREADS:
+        raise RuntimeError(
+            f"threads={server.cfg.threads} leaves no thread for token/ and the other cheap endpoints: "
+            f"/predict/ admission can hold {PREDICTION_THREADS} (PREDICTION_MAX_CONCURRENT + PREDICTION_MAX_QUEUE). "
+            f"Raise GUNICORN_THREADS or lower those limits."
+        )
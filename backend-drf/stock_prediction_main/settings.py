@@ -1,3 +1,5 @@
+import os
+import tempfile
 from decouple import config
 from datetime import timedelta
 from pathlib import Path
@@ -73,10 +75,32 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # Reuse connections across requests instead of reconnecting every time
+        'CONN_MAX_AGE': config('CONN_MAX_AGE', default=60, cast=int),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
 
+# Caches
+# 'auth' holds users resolved from JWTs (accounts.authentication.CachedJWTAuthentication).
+# Every worker process must see the same entries, or a deactivated user keeps access
+# on the other workers until the TTL expires: a file cache on tmpfs is shared by all
+# workers of a host. Point AUTH_USER_CACHE_DIR at shared storage for multi-host setups.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'auth': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': config('AUTH_USER_CACHE_DIR', default=os.path.join(
+            '/dev/shm' if os.path.isdir('/dev/shm') else tempfile.gettempdir(), 'stock-prediction-auth')),
+        'TIMEOUT': config('AUTH_USER_CACHE_TTL', default=60, cast=int),
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
 
@@ -137,11 +161,73 @@ CORS_ALLOW_METHODS = [
 ]
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.CachedJWTAuthentication',
     )
 }
 
 SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=30),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
-}
\ No newline at end of file
+}
+
+# Market data client (api/market_data.py)
+# MARKET_DATA_BASE_URL points history/news at a local HTTP stand-in instead of Yahoo
+MARKET_DATA = {
+    'BASE_URL': config('MARKET_DATA_BASE_URL', default=''),
+    'FEAR_GREED_URL': config('FEAR_GREED_URL', default='https://api.alternative.me/fng/'),
+    'RATE_LIMIT_PER_SEC': config('MARKET_DATA_RATE_LIMIT', default=2.0, cast=float),
+    'RATE_LIMIT_BURST': config('MARKET_DATA_RATE_BURST', default=5, cast=int),
+    'MAX_RETRIES': config('MARKET_DATA_MAX_RETRIES', default=3, cast=int),
+    'BACKOFF_FACTOR': config('MARKET_DATA_BACKOFF', default=0.5, cast=float),
+    'POOL_SIZE': config('MARKET_DATA_POOL_SIZE', default=10, cast=int),
+    'TIMEOUT': config('MARKET_DATA_TIMEOUT', default=10, cast=int),
+}
+
+# Report per-stage peak allocation (tracemalloc) in every /predict/ response.
+# In DEBUG, ?memory_profile=1 enables it for a single request.
+PREDICTION_MEMORY_PROFILE = config('PREDICTION_MEMORY_PROFILE', default=False, cast=bool)
+
+# Staff users can profile a single /predict/ request with the X-Profile: 1 header or ?profile=1.
+# The per-stage cProfile summary is returned inline; the full .prof is kept here for download.
+PREDICTION_PROFILE_DIR = config('PREDICTION_PROFILE_DIR', default=str(BASE_DIR / 'profiles'))
+
+# Default latency budget for /predict/ when the client sends no deadline_ms (api/deadline.py).
+# Charts, then evaluation, then fresh news / Fear & Greed are dropped when the budget runs short.
+PREDICTION_DEADLINE = {
+    'DEFAULT_MS': config('PREDICTION_DEADLINE_MS', default=8000, cast=int),
+    'MAX_MS': config('PREDICTION_DEADLINE_MAX_MS', default=60000, cast=int),
+}
+
+# Admission control for /predict/ (api/admission.py), per worker process
+PREDICTION_ADMISSION = {
+    'MAX_CONCURRENT': config('PREDICTION_MAX_CONCURRENT', default=2, cast=int),
+    'MAX_PER_USER': config('PREDICTION_MAX_PER_USER', default=1, cast=int),
+    'MAX_QUEUE': config('PREDICTION_MAX_QUEUE', default=8, cast=int),
+    'MAX_WAIT_SECONDS': config('PREDICTION_MAX_WAIT_SECONDS', default=15.0, cast=float),
+    'INITIAL_SERVICE_SECONDS': 3.0,
+}
+
+# Trained LSTM used by /predict/ and the backtest
+PREDICTION_MODEL_PATH = config('PREDICTION_MODEL_PATH', default=str(BASE_DIR / 'stock_prediction_model.keras'))
+
+# Reduced-precision model variants written by `manage.py quantize_model` (api/inference.py).
+# A variant is served only if its held-out MAPE / directional accuracy are within
+# these many percentage points of the float32 model.
+MODEL_VARIANTS_MANIFEST = config('MODEL_VARIANTS_MANIFEST', default=str(BASE_DIR / 'model_variants' / 'manifest.json'))
+MODEL_ACCURACY_TOLERANCE = {
+    'MAPE_INCREASE': config('MODEL_MAPE_TOLERANCE', default=0.1, cast=float),
+    'DIRECTIONAL_DROP': config('MODEL_DIRECTIONAL_TOLERANCE', default=1.0, cast=float),
+}
+
+# Cross-worker shared price data (api/shared_data.py): memory-mapped histories
+# under SHARED_DATA_DIR (default /dev/shm/stock-prediction), refetched when older than MAX_AGE_SECONDS
+SHARED_DATA = {
+    'ENABLED': config('SHARED_DATA_ENABLED', default=True, cast=bool),
+    'DIR': config('SHARED_DATA_DIR', default=''),
+    'MAX_AGE_SECONDS': config('SHARED_DATA_MAX_AGE', default=900, cast=int),
+}
+
+# Load the serving model at import time of the WSGI app (before gunicorn forks workers).
+# Only enable with a fork-safe runtime (e.g. the TFLite variant); TensorFlow's own
+# thread pools do not survive fork.
+PRELOAD_MODEL = config('PRELOAD_MODEL', default=False, cast=bool)
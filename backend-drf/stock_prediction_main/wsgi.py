@@ -14,3 +14,11 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'stock_prediction_main.settings')
 
 application = get_wsgi_application()
+
+# Load the model in the master process when the server preloads the app
+# (gunicorn --preload), so forked workers share its pages copy-on-write.
+from django.conf import settings  # noqa: E402
+
+if settings.PRELOAD_MODEL:
+    from api.inference import get_predictor  # noqa: E402
+    get_predictor()